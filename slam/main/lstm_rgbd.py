@@ -18,7 +18,8 @@ def start_training():
     config_provider = get_config_provider()
     
     epoch = config_provider.epoch()
-    batch_size = config_provider.batch_size()
+    # every row of a batch is a sequence with its own lstm state lane
+    batch_size = config_provider.lstm_lanes()
     sequence_length = config_provider.sequence_length()
     lstm_layers = config_provider.lstm_layers()
     cnn_output_dim = config_provider.cnn_output_dim()
@@ -27,13 +28,14 @@ def start_training():
     rgbd_input_batch = tf.placeholder(tf.float32, [batch_size, img_h, img_w, 4])
     groundtruth_batch = tf.placeholder(tf.float32, [batch_size, 6])
     lstm_init_state = tf.placeholder(tf.float32, [batch_size, 2 * cnn_output_dim * lstm_layers])
+    loss_mask = tf.placeholder(tf.float32, [batch_size])
     
     network = build_complete_network(rgbd_input_batch, groundtruth_batch, lstm_init_state, batch_size, lstm_layers, cnn_output_dim, normalization_epsilon)
     
     lstm_model = network[2]
     
     loss_weight = tf.placeholder(tf.float32, [6, 6])
-    loss = lstm_model.add_loss(loss_weight)
+    loss = lstm_model.add_loss(loss_weight, loss_mask)
     apply_gradient_op = lstm_model.add_optimizer()
     
     session = tf.Session()
@@ -50,15 +52,18 @@ def start_training():
     for step in xrange(epoch):
         logger.info('Executing epoc:{}'.format(step))
         
+        # every lane of the batch is a sequence of its own with its own lstm state
         input_batch = input_provider.sequence_batch_itr(sequence_length, batch_size)
+        lstm_state = np.zeros([batch_size, 2 * cnn_output_dim * lstm_layers], np.float32)
         for i, sequence_batch in enumerate(input_batch):
             logger.debug('Using rgb files:{}, depth files:{}, groundtruths:{} in current batch'.format(sequence_batch.rgb_filenames,
                                                                          sequence_batch.depth_filenames, sequence_batch.groundtruths))
-            loss_weight_matrix = np.zeros([6, 6]) if i == 0 else np.identity(6)
-            result = session.run([apply_gradient_op, loss, merged_summary], feed_dict={rgbd_input_batch:sequence_batch.rgbd_images,
-                                        groundtruth_batch:sequence_batch.groundtruths, loss_weight:loss_weight_matrix,
-                                        lstm_init_state:np.zeros([batch_size, 2 * cnn_output_dim * lstm_layers], np.float32)})
+            result = session.run([apply_gradient_op, loss, merged_summary, lstm_model.final_state],
+                                 feed_dict={rgbd_input_batch:sequence_batch.feed_images(), groundtruth_batch:sequence_batch.groundtruths,
+                                            loss_weight:np.identity(6), loss_mask:get_loss_mask(sequence_batch),
+                                            lstm_init_state:reset_lstm_state(lstm_state, sequence_batch)})
             loss_value = result[1]
+            lstm_state = result[3]
             logger.info('epoc:{}, sequence number:{}, loss:{}'.format(step, i, loss_value))
             
         summary_writer.add_summary(result[2], step)
@@ -66,6 +71,19 @@ def start_training():
         
         logger.info('epoc:{}, loss:{}'.format(step, loss_value))
 
+def reset_lstm_state(lstm_state, sequence_batch):
+    """
+    Zeros the lstm state of the lanes which start a new sequence or are padding at the current frame.
+    """
+    lstm_state[sequence_batch.reset | ~sequence_batch.valid] = 0
+    return lstm_state
+
+def get_loss_mask(sequence_batch):
+    """
+    Returns the loss weights of the lanes: the first frame of a sequence has no previous frame in the lstm
+    state to predict its twist from and padded lanes have no frame.
+    """
+    return (sequence_batch.valid & ~sequence_batch.reset).astype(np.float32)
 
 
 def build_complete_network(rgbd_input_batch, groundtruth_batch, lstm_init_state, batch_size, lstm_layers, cnn_output_dim, normalization_epsilon):
@@ -91,8 +109,10 @@ def evaluate_model():
     groundtruth_batch = tf.placeholder(tf.float32, [batch_size, 6])
     lstm_init_state = tf.placeholder(tf.float32, [batch_size, 2 * cnn_output_dim * lstm_layers])
     
-    network = build_complete_network(rgbd_input_batch, groundtruth_batch, lstm_init_state, batch_size, lstm_layers, cnn_output_dim)
+    network = build_complete_network(rgbd_input_batch, groundtruth_batch, lstm_init_state, batch_size, lstm_layers, cnn_output_dim,
+                                     config_provider.normalization_epsilon())
     
+    lstm_model = network[2]
     lstm_output = network[3]
 
     session = tf.Session()
@@ -107,9 +127,12 @@ def evaluate_model():
     for step in xrange(10):
         logger.info('Executing evaluation step:{} '.format(step))
         input_batch = input_provider.sequence_batch_itr(sequence_length, batch_size)
+        lstm_state = np.zeros([batch_size, 2 * cnn_output_dim * lstm_layers], np.float32)
         for _, sequence_batch in enumerate(input_batch):
-            result = session.run([lstm_output], feed_dict={rgbd_input_batch:sequence_batch.rgbd_images,
-                                        groundtruth_batch:sequence_batch.groundtruths})
+            result = session.run([lstm_output, lstm_model.final_state], feed_dict={rgbd_input_batch:sequence_batch.feed_images(),
+                                        groundtruth_batch:sequence_batch.groundtruths,
+                                        lstm_init_state:reset_lstm_state(lstm_state, sequence_batch)})
+            lstm_state = result.pop()
             rmse = (np.array(result) - sequence_batch.groundtruths) ** 2
             total_rmse += rmse
             logger.info('Input frame info: rgb file:{}, depth file:{}, groundtruth:{}, predicted params:{}, rmse:{} '.format(sequence_batch.rgb_filenames,
@@ -47,7 +47,7 @@ if __name__ == '__main__':
         for i, sequence_batch in enumerate(next_batch):
             logger.debug('epoc:{}, seq_no:{}, rgb files:{}, depth files:{}, groundtruths:{} in current batch'.format(step, i, sequence_batch.rgb_filenames,
                                                             sequence_batch.depth_filenames, sequence_batch.groundtruths))
-            result = session.run([apply_gradient_op, loss, merged_summary], feed_dict={rgb_input_batch:sequence_batch.rgbd_images,
+            result = session.run([apply_gradient_op, loss, merged_summary], feed_dict={rgb_input_batch:sequence_batch.feed_images(),
                                         groundtruth_batch:sequence_batch.groundtruths})
             loss_value = result[1]
             logger.info('epoc:{}, seq_no:{} loss :{}'.format(step, i, loss_value))
@@ -54,7 +54,7 @@ if __name__ == '__main__':
                                                                                                             sequence_batch.groundtruths))
             loss_weight_matrix = np.zeros([6, 6]) if i == 0 else np.identity(6)
             result = session.run([apply_gradient_op, loss, merged_summary],
-                                 feed_dict={rgbd_input_batch: sequence_batch.rgbd_images,
+                                 feed_dict={rgbd_input_batch: sequence_batch.feed_images(),
                                             groundtruth_batch: sequence_batch.groundtruths,
                                             loss_weight: loss_weight_matrix})
             loss_value = result[1]
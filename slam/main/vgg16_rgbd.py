@@ -50,7 +50,7 @@ if __name__ == '__main__':
             logger.debug('epoc:{}, seq_no:{}, rgb files:{}, depth files:{}, groundtruths:{} in current batch'.format(step, i, sequence_batch.rgb_filenames,
                                                                          sequence_batch.depth_filenames, sequence_batch.groundtruths))
             loss_weight_matrix = np.zeros([6, 6]) if i == 0 else np.identity(6)
-            result = session.run([apply_gradient_op, loss, merged_summary], feed_dict={rgbd_input_batch:sequence_batch.rgbd_images,
+            result = session.run([apply_gradient_op, loss, merged_summary], feed_dict={rgbd_input_batch:sequence_batch.feed_images(),
                                         groundtruth_batch:sequence_batch.groundtruths, loss_weight:loss_weight_matrix})
             loss_value = result[1]
             logger.info('epoc:{}, seq_no:{} loss :{}'.format(step, i, loss_value))
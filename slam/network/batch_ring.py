@@ -0,0 +1,33 @@
+"""
+Ring of preallocated batch arrays. The frames and labels of a batch are written directly into the arrays
+of a slot, normalized and converted to float32 on the way, and fed from there, so that a training step
+allocates no batch arrays: neither lists of frames nor a stacked copy nor a converted copy for the feed.
+"""
+
+import numpy as np
+
+
+class BatchRing:
+    """
+    slots batches of C-contiguous float32 images of shape [batch_size] + frame_shape and float32 labels of
+    shape [batch_size, label_dim]. The batch number counter uses slot counter % slots, a slot is reused
+    slots batches later. The ring has to have more slots than batches are alive at a time, i.e. loaded
+    ahead by prefetching plus the one which is being fed.
+    """
+
+    def __init__(self, slots, batch_size, frame_shape=(224, 224, 4), label_dim=6):
+        self.slots = slots
+        self.images = np.zeros((slots, batch_size) + tuple(frame_shape), dtype=np.float32)
+        self.labels = np.zeros((slots, batch_size, label_dim), dtype=np.float32)
+
+    def __len__(self):
+        return self.slots
+
+    def batch_size(self):
+        return self.images.shape[1]
+
+    def slot(self, counter):
+        """
+        Returns the images and labels arrays of the slot of batch number counter.
+        """
+        return self.images[counter % self.slots], self.labels[counter % self.slots]
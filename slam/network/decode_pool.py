@@ -0,0 +1,74 @@
+"""
+Process pool for the CPU bound part of the rgbd input pipeline. PNG decoding, depth scaling and resizing
+hold the GIL, so they are run in worker processes which write the frames directly into shared memory.
+Only the filenames and the slot of a frame are sent to a worker and only the slot is sent back, the
+frames themselves are never pickled. Frames are decoded as uint8 by default, which keeps the shared
+buffers at a quarter of their float32 size.
+"""
+
+import ctypes
+from multiprocessing import Pool
+from multiprocessing.sharedctypes import RawArray
+import threading
+
+import numpy as np
+from slam.network.image_processing import read_rgbd_image
+
+
+_shared_frames = None
+
+_resize_methods = None
+
+def _init_worker(shared_buffer, shape, dtype, resize_methods):
+    global _shared_frames, _resize_methods
+    _shared_frames = np.frombuffer(shared_buffer, dtype=dtype).reshape(shape)
+    _resize_methods = resize_methods
+
+def _decode_frame(args):
+    buffer_index, position, rgb_filename, depth_filename = args
+    frames = _shared_frames[buffer_index]
+    frames[position] = read_rgbd_image(rgb_filename, depth_filename, frames.shape[2], frames.shape[1], *_resize_methods,
+                                       dtype=frames.dtype)
+    return position
+
+
+class DecodePool:
+    """
+    Decodes batches of rgbd frames with a pool of processes into a ring of shared memory buffers. The array
+    returned by decode() is a view of one buffer and is overwritten by the buffers-th next call, consumers
+    have to copy or transform the frames before that. Batches larger than batch_size are decoded in parts
+    and returned as a copy.
+    """
+
+    def __init__(self, processes=None, batch_size=32, buffers=4, width=224, height=224, resize_method='skimage', depth_resize_method=None,
+                 dtype=np.uint8):
+        self.batch_size = batch_size
+        self.buffers = buffers
+        self.shape = (buffers, batch_size, height, width, 4)
+        self.dtype = np.dtype(dtype)
+        # allocated before the pool is started so that the workers inherit it
+        shared_buffer = RawArray(ctypes.c_char, int(np.prod(self.shape)) * self.dtype.itemsize)
+        self.frames = np.frombuffer(shared_buffer, dtype=self.dtype).reshape(self.shape)
+        self.pool = Pool(processes, initializer=_init_worker,
+                         initargs=(shared_buffer, self.shape, self.dtype, (resize_method, depth_resize_method)))
+        self.next_buffer = 0
+        self.lock = threading.Lock()
+
+    def decode(self, filename_pairs):
+        """
+        Decodes the given (rgb_filename, depth_filename) pairs in parallel and returns the frames as an
+        array of shape [len(filename_pairs), height, width, 4].
+        """
+        if len(filename_pairs) > self.batch_size:
+            return np.concatenate([np.array(self.decode(filename_pairs[start:start + self.batch_size]))
+                                   for start in xrange(0, len(filename_pairs), self.batch_size)])
+        with self.lock:
+            buffer_index = self.next_buffer
+            self.next_buffer = (self.next_buffer + 1) % self.buffers
+        tasks = [(buffer_index, position, rgb_filename, depth_filename) for position, (rgb_filename, depth_filename) in enumerate(filename_pairs)]
+        self.pool.map(_decode_frame, tasks, chunksize=1)
+        return self.frames[buffer_index, :len(filename_pairs)]
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
@@ -0,0 +1,104 @@
+"""
+Build-once cache of the preprocessed rgbd frames of a sequence. All frames of the frame table are
+decoded, depth scaled and resized once and stored as a single uint8 .npy array of shape
+[n, height, width, 4] together with the twist labels of the frames. The arrays are memory-mapped, so reading a frame is a
+zero-copy slice instead of two PNG decodes and a resize.
+
+The cache files are named after a key computed from the preprocessing parameters, changing one of them
+leads to a new cache file. A cache is rebuilt when the frame table of the sequence is newer.
+"""
+
+import os
+
+import numpy as np
+from slam.network.image_processing import read_rgbd_image
+from slam.preprocess.frame_index import FRAME_TABLE_FILENAME, load_frame_table
+from slam.utils.file_utils import atomic_save, is_up_to_date, parameter_key
+from slam.utils.logging_utils import get_logger
+from slam.utils.time_utils import time_it
+
+
+CACHE_DIRNAME = 'cache'
+
+# increase when the preprocessing changes without a change of its parameters
+CACHE_VERSION = 2
+
+
+class FrameCache:
+
+    def __init__(self, cache_dir=None, width=224, height=224, decode_pool=None, resize_method='skimage', depth_resize_method=None,
+                 dtype=np.uint8):
+        """
+        cache_dir -- directory of the cache files, by default a 'cache' directory in every sequence
+        decode_pool -- DecodePool used to build the cache, frames are decoded in this process without it;
+                       it has to use the same resize methods and dtype
+        """
+        self.cache_dir = cache_dir
+        self.dtype = np.dtype(dtype)
+        self.resize_method = resize_method
+        self.depth_resize_method = depth_resize_method
+        self.decode_pool = decode_pool
+        self.width = width
+        self.height = height
+        self.logger = get_logger()
+
+    def parameters(self):
+        return {'version': CACHE_VERSION, 'width': self.width, 'height': self.height,
+                'depth_scale': 'max', 'resize': self.resize_method, 'depth_resize': self.depth_resize_method, 'dtype': self.dtype.name}
+
+    def key(self):
+        return parameter_key(self.parameters())
+
+    def _cache_files(self, seq_dir):
+        if self.cache_dir:
+            directory = os.path.join(self.cache_dir, os.path.basename(os.path.normpath(seq_dir)))
+        else:
+            directory = os.path.join(seq_dir, CACHE_DIRNAME)
+        return (os.path.join(directory, 'rgbd_{}.npy'.format(self.key())),
+                os.path.join(directory, 'twist_{}.npy'.format(self.key())))
+
+    def is_cached(self, seq_dir):
+        frames_file, labels_file = self._cache_files(seq_dir)
+        sources = [os.path.join(seq_dir, FRAME_TABLE_FILENAME)]
+        return is_up_to_date(frames_file, sources) and is_up_to_date(labels_file, sources)
+
+    def load(self, seq_dir, labels):
+        """
+        Returns the memory-mapped frames of shape [n, height, width, 4] and twist labels of shape [n, 6]
+        of a sequence, building the cache from the frame table and the given labels if necessary.
+        """
+        labels = np.asarray(labels, dtype=np.float32)
+        if not self.is_cached(seq_dir):
+            self.build(seq_dir, labels)
+        frames_file, labels_file = self._cache_files(seq_dir)
+        if not np.array_equal(np.load(labels_file, mmap_mode='r'), labels):
+            self._save_labels(labels_file, labels)
+        return np.load(frames_file, mmap_mode='r'), np.load(labels_file, mmap_mode='r')
+
+    def _save_labels(self, labels_file, labels):
+        with atomic_save(labels_file) as tmp_file:
+            np.save(tmp_file, labels)
+
+    @time_it
+    def build(self, seq_dir, labels):
+        frame_table = load_frame_table(seq_dir)
+        frames_file, labels_file = self._cache_files(seq_dir)
+        if not os.path.exists(os.path.dirname(frames_file)):
+            os.makedirs(os.path.dirname(frames_file))
+        self.logger.info('Building frame cache of {} frames at:{}'.format(len(frame_table), frames_file))
+
+        filename_pairs = [(os.path.join(seq_dir, rgb_filename), os.path.join(seq_dir, depth_filename))
+                          for rgb_filename, depth_filename in zip(frame_table.rgb_filenames(), frame_table.depth_filenames())]
+        with atomic_save(frames_file) as tmp_file:
+            frames = np.lib.format.open_memmap(tmp_file, mode='w+', dtype=self.dtype, shape=(len(frame_table), self.height, self.width, 4))
+            if self.decode_pool:
+                batch_size = self.decode_pool.batch_size
+                for start in xrange(0, len(filename_pairs), batch_size):
+                    frames[start:start + batch_size] = self.decode_pool.decode(filename_pairs[start:start + batch_size])
+            else:
+                for i, (rgb_filename, depth_filename) in enumerate(filename_pairs):
+                    frames[i] = read_rgbd_image(rgb_filename, depth_filename, self.width, self.height, self.resize_method,
+                                                self.depth_resize_method, self.dtype)
+            frames.flush()
+            del frames
+            self._save_labels(labels_file, labels)
@@ -0,0 +1,244 @@
+"""
+Sharded record files of the frames of a sequence. Every record holds the frame pair of one entry of the
+frame table, either the encoded PNG files as they are or the preprocessed uint8 rgbd frame, together with
+its stamps and twist label. Records are appended in frame order to shards of shard_size frames, so that a
+window of frames is one contiguous read from one or two shard files instead of two small file opens per
+frame.
+
+An index of RECORD_DTYPE entries (shard, byte offset and sizes, stamps and label of every record) is written
+last and loaded completely by the reader, seeking to a frame offset needs no I/O besides the read itself.
+Like the frame cache, the records are named after a key of their parameters and rebuilt when the frame
+table of the sequence is newer.
+"""
+
+from cStringIO import StringIO
+import json
+import os
+import threading
+
+import numpy as np
+from slam.network.image_processing import read_rgbd_image
+from slam.preprocess.frame_index import FRAME_TABLE_FILENAME, load_frame_table
+from slam.utils.file_utils import atomic_save, is_up_to_date, parameter_key
+from slam.utils.logging_utils import get_logger
+from slam.utils.time_utils import time_it
+
+
+RECORDS_DIRNAME = 'records'
+INDEX_FILENAME = 'index.bin'
+META_FILENAME = 'meta.json'
+
+# increase when the preprocessing of decoded records changes without a change of its parameters
+RECORDS_VERSION = 2
+
+RECORD_DTYPE = np.dtype([('shard', '<i4'),
+                         ('offset', '<i8'),
+                         ('rgb_size', '<i4'),
+                         ('depth_size', '<i4'),
+                         ('rgb_stamp', '<f8'),
+                         ('depth_stamp', '<f8'),
+                         ('twist', '<f4', (6,))])
+
+
+def _shard_filename(record_dir, shard):
+    return os.path.join(record_dir, 'shard-{:05d}.bin'.format(shard))
+
+
+class RecordWriter:
+    """
+    Writes the records of one sequence. encoded records hold the bytes of the rgb and the depth file,
+    otherwise every record is an rgbd frame of the given shape and dtype.
+    """
+
+    def __init__(self, record_dir, encoded=True, shape=None, dtype=np.uint8, shard_size=1024):
+        if not os.path.exists(record_dir):
+            os.makedirs(record_dir)
+        self.record_dir = record_dir
+        self.meta = {'encoded': encoded, 'shape': list(shape) if shape else None, 'dtype': np.dtype(dtype).name,
+                     'shard_size': shard_size}
+        self.records = []
+        self.shard_file = None
+        self.offset = 0
+
+    def write(self, rgb, depth, rgb_stamp, depth_stamp, twist):
+        """
+        Appends a record, rgb and depth are the encoded files or rgb is the rgbd frame and depth is None.
+        """
+        if len(self.records) % self.meta['shard_size'] == 0:
+            self._next_shard()
+        if not self.meta['encoded']:
+            rgb, depth = np.ascontiguousarray(rgb, dtype=self.meta['dtype']).tostring(), ''
+        self.shard_file.write(rgb)
+        self.shard_file.write(depth)
+        self.records.append((len(self.records) // self.meta['shard_size'], self.offset, len(rgb), len(depth),
+                             rgb_stamp, depth_stamp, twist))
+        self.offset += len(rgb) + len(depth)
+
+    def _next_shard(self):
+        if self.shard_file:
+            self.shard_file.close()
+        self.shard_file = open(_shard_filename(self.record_dir, len(self.records) // self.meta['shard_size']), 'wb')
+        self.offset = 0
+
+    def close(self):
+        if self.shard_file:
+            self.shard_file.close()
+        with open(os.path.join(self.record_dir, META_FILENAME), 'w') as f:
+            json.dump(self.meta, f)
+        write_index(self.record_dir, np.array(self.records, dtype=RECORD_DTYPE))
+
+
+def write_index(record_dir, index):
+    with atomic_save(os.path.join(record_dir, INDEX_FILENAME)) as tmp_file:
+        index.astype(RECORD_DTYPE).tofile(tmp_file)
+
+
+class RecordReader:
+    """
+    Reads windows of records of a sequence. The shard files are kept open, reads are serialized so that
+    one reader can be shared by prefetching threads.
+    """
+
+    def __init__(self, record_dir):
+        self.record_dir = record_dir
+        with open(os.path.join(record_dir, META_FILENAME)) as f:
+            self.meta = json.load(f)
+        self.encoded = self.meta['encoded']
+        self.index = np.fromfile(os.path.join(record_dir, INDEX_FILENAME), dtype=RECORD_DTYPE)
+        self.shard_files = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.index)
+
+    def labels(self):
+        return self.index['twist']
+
+    def stamps(self):
+        return self.index['rgb_stamp'], self.index['depth_stamp']
+
+    def _read(self, shard, offset, size):
+        with self.lock:
+            if shard not in self.shard_files:
+                self.shard_files[shard] = open(_shard_filename(self.record_dir, shard), 'rb')
+            shard_file = self.shard_files[shard]
+            shard_file.seek(offset)
+            return shard_file.read(size)
+
+    def count_within(self, start, count, max_bytes):
+        """
+        Returns the number of the records start, ..., start + count - 1 which are read with at most max_bytes,
+        at least one.
+        """
+        index = self.index[start:start + count]
+        sizes = np.cumsum(index['rgb_size'].astype(np.int64) + index['depth_size'])
+        return max(int(np.searchsorted(sizes, max_bytes, side='right')), 1)
+
+    def read(self, start, count=1):
+        """
+        Reads the records start, ..., start + count - 1 with one read per shard. Returns a list of
+        (rgb, depth) file contents for encoded records and an array of shape [count] + shape otherwise.
+        """
+        index = self.index[start:start + count]
+        records = []
+        for shard in np.unique(index['shard']):
+            shard_index = index[index['shard'] == shard]
+            begin = shard_index['offset'][0]
+            end = shard_index['offset'][-1] + shard_index['rgb_size'][-1] + shard_index['depth_size'][-1]
+            data = self._read(shard, begin, end - begin)
+            for offset, rgb_size, depth_size in zip(shard_index['offset'] - begin, shard_index['rgb_size'], shard_index['depth_size']):
+                records.append((data[offset:offset + rgb_size], data[offset + rgb_size:offset + rgb_size + depth_size]))
+        if self.encoded:
+            return records
+        frames = np.empty([len(records)] + self.meta['shape'], dtype=self.meta['dtype'])
+        for i, (rgb, _) in enumerate(records):
+            frames[i] = np.frombuffer(rgb, dtype=frames.dtype).reshape(frames.shape[1:])
+        return frames
+
+    def close(self):
+        with self.lock:
+            for shard_file in self.shard_files.values():
+                shard_file.close()
+            self.shard_files = {}
+
+
+def decode_record(rgb, depth, width=224, height=224, resize_method='skimage', depth_resize_method=None, dtype=np.uint8):
+    """
+    Decodes an encoded record into an rgbd frame like read_rgbd_image.
+    """
+    return read_rgbd_image(StringIO(rgb), StringIO(depth), width, height, resize_method, depth_resize_method, dtype)
+
+
+class FrameRecords:
+    """
+    Builds and opens the records of sequences, analogous to FrameCache. encoded records keep the PNG
+    files, so that they are independent of the preprocessing; otherwise the preprocessed uint8 frames are
+    stored and the records are keyed on the preprocessing parameters.
+    """
+
+    def __init__(self, records_dir=None, encoded=True, width=224, height=224, resize_method='skimage', depth_resize_method=None,
+                 shard_size=1024):
+        """
+        records_dir -- directory of the records, by default a 'records' directory in every sequence
+        """
+        self.records_dir = records_dir
+        self.encoded = encoded
+        self.width = width
+        self.height = height
+        self.resize_method = resize_method
+        self.depth_resize_method = depth_resize_method
+        self.shard_size = shard_size
+        self.logger = get_logger()
+
+    def parameters(self):
+        if self.encoded:
+            return {'encoded': True}
+        return {'encoded': False, 'version': RECORDS_VERSION, 'width': self.width, 'height': self.height, 'depth_scale': 'max', 'resize': self.resize_method,
+                'depth_resize': self.depth_resize_method, 'dtype': 'uint8'}
+
+    def key(self):
+        return parameter_key(self.parameters())
+
+    def _record_dir(self, seq_dir):
+        if self.records_dir:
+            directory = os.path.join(self.records_dir, os.path.basename(os.path.normpath(seq_dir)))
+        else:
+            directory = os.path.join(seq_dir, RECORDS_DIRNAME)
+        return os.path.join(directory, self.key())
+
+    def is_built(self, seq_dir):
+        return is_up_to_date(os.path.join(self._record_dir(seq_dir), INDEX_FILENAME), [os.path.join(seq_dir, FRAME_TABLE_FILENAME)])
+
+    def load(self, seq_dir, labels):
+        """
+        Returns a RecordReader of the records of a sequence, building them from the frame table and the
+        given labels if necessary.
+        """
+        labels = np.asarray(labels, dtype=np.float32)
+        if not self.is_built(seq_dir):
+            self.build(seq_dir, labels)
+        reader = RecordReader(self._record_dir(seq_dir))
+        if not np.array_equal(reader.labels(), labels):
+            reader.index['twist'] = labels
+            write_index(reader.record_dir, reader.index)
+        return reader
+
+    @time_it
+    def build(self, seq_dir, labels):
+        frame_table = load_frame_table(seq_dir)
+        record_dir = self._record_dir(seq_dir)
+        self.logger.info('Writing {} frame records at:{}'.format(len(frame_table), record_dir))
+
+        writer = RecordWriter(record_dir, self.encoded, (self.height, self.width, 4), np.uint8, self.shard_size)
+        frames = frame_table.frames
+        for i, (rgb_filename, depth_filename) in enumerate(zip(frame_table.rgb_filenames(), frame_table.depth_filenames())):
+            rgb_filename = os.path.join(seq_dir, rgb_filename)
+            depth_filename = os.path.join(seq_dir, depth_filename)
+            if self.encoded:
+                with open(rgb_filename, 'rb') as rgb_file, open(depth_filename, 'rb') as depth_file:
+                    rgb, depth = rgb_file.read(), depth_file.read()
+            else:
+                rgb, depth = read_rgbd_image(rgb_filename, depth_filename, self.width, self.height, self.resize_method,
+                                             self.depth_resize_method, np.uint8), None
+            writer.write(rgb, depth, frames['rgb_stamp'][i], frames['depth_stamp'][i], labels[i])
+        writer.close()
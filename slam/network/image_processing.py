@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+from slam.network.image_resize import resize
+
+
+def read_rgbd_image(rgb_filename, depth_filename, width=224, height=224, resize_method='skimage', depth_resize_method=None,
+                    dtype=np.float32):
+    """
+    Reads a rgb and a depth image, scales the depth to [0, 255] and returns the
+    concatenated rgbd image of shape [height, width, 4].
+    
+    resize_method -- resize backend of image_resize, used for the depth image as well 
+                     unless depth_resize_method is given
+    dtype -- dtype of the rgbd image, the values of uint8 images are rounded
+    """
+    from scipy import ndimage
+    rgb_img = ndimage.imread(rgb_filename)
+    depth_img = _scale_depth(ndimage.imread(depth_filename))
+
+    if resize_method != 'skimage' or depth_resize_method not in [None, 'skimage']:
+        # resized separately, rgb on its original dtype
+        rgb_img = resize(rgb_img, height, width, resize_method)
+        depth_img = resize(depth_img, height, width, depth_resize_method or resize_method)
+        return _convert(np.concatenate((rgb_img, depth_img[:, :, None]), 2), dtype)
+
+    rgbd_img = np.concatenate((rgb_img, depth_img[:, :, None]), 2)
+
+    # Resize
+    from skimage import transform
+    rgbd_img = transform.resize(rgbd_img, [height, width], preserve_range=True)
+
+    return _convert(rgbd_img, dtype)
+
+def _scale_depth(depth_img):
+    # scaled to [0, 255] in float like the channel statistics, integer arithmetic overflows 16-bit depth
+    # images and rounds down
+    depth_img = depth_img.astype(np.float32)
+    depth_img *= 255.0 / np.max(depth_img)
+    return depth_img
+
+def _convert(rgbd_img, dtype):
+    if np.issubdtype(dtype, np.integer):
+        return np.clip(np.rint(rgbd_img), 0, 255).astype(dtype)
+    return rgbd_img.astype(dtype)
+
+def read_rescaled_rgb_image(filepath, short_side=256, resize_method='skimage', dtype=np.uint8, jpeg_draft=False):
+    """
+    Reads a rgb image and scales it such that its shorter side has short_side pixels.
+    
+    resize_method -- resize backend of image_resize
+    dtype -- dtype of the image, the values of uint8 images are rounded
+    jpeg_draft -- JPEG images are decoded at 1/2, 1/4 or 1/8 of their size by the decoder, the strongest
+                  reduction which keeps the shorter side at least short_side, and resized from there; other
+                  images are decoded at full size
+    """
+    if jpeg_draft:
+        rgb_img, (img_height, img_width) = _read_draft_image(filepath, short_side)
+    else:
+        from scipy import ndimage
+        rgb_img = ndimage.imread(filepath)
+        img_height, img_width = rgb_img.shape[:2]
+    factor = float(short_side) / min(img_height, img_width)
+    height = int(round(img_height * factor))
+    width = int(round(img_width * factor))
+    if resize_method == 'skimage':
+        from skimage import transform
+        rgb_img = transform.resize(rgb_img, [height, width], preserve_range=True)
+    else:
+        rgb_img = resize(rgb_img, height, width, resize_method)
+    return _convert(rgb_img, dtype)
+
+def _read_draft_image(filepath, short_side):
+    # returns the image decoded in draft mode and the size of the original image
+    from PIL import Image
+    image = Image.open(filepath)
+    img_width, img_height = image.size
+    factor = float(short_side) / min(img_height, img_width)
+    image.draft('RGB', (int(math.ceil(img_width * factor)), int(math.ceil(img_height * factor))))
+    return np.asarray(image.convert('RGB')), (img_height, img_width)
@@ -0,0 +1,104 @@
+"""
+Resize backends for the input pipeline. Besides skimage's general spline resize, which works on float64
+images, images can be resized with
+
+area     -- averages the input pixels covered by an output pixel, best suited for downscaling
+bilinear -- interpolates between the four closest input pixels
+nearest  -- picks the closest input pixel, keeps the values of depth images intact
+
+area and bilinear are separable and applied per axis as weighted sums of a few input pixels with
+precomputed indices and weights, nearest is a gather with precomputed indices. They work on uint8/uint16 (or float) images of shape [h, w] or
+[h, w, c] without converting them to float64.
+"""
+
+import threading
+
+import numpy as np
+
+
+METHODS = ['skimage', 'area', 'bilinear', 'nearest']
+
+_taps = {}
+_taps_lock = threading.Lock()
+
+
+def _area_taps(size_in, size_out):
+    scale = float(size_in) / size_out
+    starts = np.arange(size_out) * scale
+    pixels = np.floor(starts).astype(np.int64)[:, None] + np.arange(int(np.ceil(scale)) + 1)
+    # overlap of the input pixel [i, i + 1) with the output pixel [start, start + scale)
+    overlap = np.minimum(starts[:, None] + scale, pixels + 1) - np.maximum(starts[:, None], pixels)
+    # pixels beyond the image do not overlap any output pixel
+    return np.minimum(pixels, size_in - 1), (np.maximum(overlap, 0) / scale).astype(np.float32)
+
+def _bilinear_taps(size_in, size_out):
+    scale = float(size_in) / size_out
+    positions = np.clip((np.arange(size_out) + 0.5) * scale - 0.5, 0, size_in - 1)
+    lower = np.floor(positions).astype(np.int64)
+    fraction = (positions - lower).astype(np.float32)
+    return np.stack([lower, np.minimum(lower + 1, size_in - 1)], 1), np.stack([1 - fraction, fraction], 1)
+
+def _nearest_indices(size_in, size_out):
+    scale = float(size_in) / size_out
+    return np.minimum(np.floor((np.arange(size_out) + 0.5) * scale).astype(np.int64), size_in - 1)
+
+def _get_taps(method, size_in, size_out):
+    key = (method, size_in, size_out)
+    if key not in _taps:
+        with _taps_lock:
+            if method == 'area':
+                _taps[key] = _area_taps(size_in, size_out)
+            elif method == 'bilinear':
+                _taps[key] = _bilinear_taps(size_in, size_out)
+            else:
+                _taps[key] = _nearest_indices(size_in, size_out)
+    return _taps[key]
+
+def _resize_axis(image, axis, indices, weights):
+    """
+    Weighted sum of the input pixels indices[i, :] along an axis for every output pixel i.
+    """
+    shape = [1] * image.ndim
+    shape[axis] = -1
+    resized = None
+    for tap in xrange(indices.shape[1]):
+        # the product with the float32 weights converts only the gathered pixels
+        term = np.take(image, indices[:, tap], axis) * weights[:, tap].reshape(shape)
+        resized = term if resized is None else resized + term
+    return resized
+
+def resize(image, height, width, method='area', dtype=None):
+    """
+    Resizes an image of shape [h, w] or [h, w, c] to [height, width] or [height, width, c].
+
+    Input:
+    image -- image array of any numeric dtype
+    method -- one of METHODS
+    dtype -- dtype of the result; by default nearest keeps the dtype of the image, area and bilinear
+             return float32 and skimage returns float64. Integer results are rounded.
+
+    Output:
+    resized image
+    """
+    if method not in METHODS:
+        raise ValueError('Unknown resize method:{}, expected one of {}'.format(method, METHODS))
+
+    if method == 'skimage':
+        from skimage import transform
+        resized = transform.resize(image, [height, width], preserve_range=True)
+    elif method == 'nearest':
+        rows = _get_taps(method, image.shape[0], height)
+        columns = _get_taps(method, image.shape[1], width)
+        resized = image[rows[:, None], columns[None, :]]
+    else:
+        if image.dtype == np.float64:
+            image = image.astype(np.float32)
+        resized = _resize_axis(image, 0, *_get_taps(method, image.shape[0], height))
+        resized = _resize_axis(resized, 1, *_get_taps(method, image.shape[1], width))
+
+    if dtype is None or resized.dtype == dtype:
+        return resized
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        return np.clip(np.rint(resized), info.min, info.max).astype(dtype)
+    return resized.astype(dtype)
@@ -11,8 +11,13 @@ class LSTMmodel:
 
     """
     TODO: Implement tf.saver or initialization from file
+    
+    Every row of the batch is a lane of an independent sequence with its own LSTM state. init_state is the
+    state of the lanes before the frame, [batch_size, 2 * layer_size * layers], and final_state the state
+    after it, which is fed as init_state of the next frame; lanes are reset by feeding zeros. Without
+    init_state every frame starts from a zero state.
     """
-    def __init__(self, model_input, layer_size, layers, output_dim, ground_truth, batch_size, init_state):
+    def __init__(self, model_input, layer_size, layers, output_dim, ground_truth, batch_size, init_state=None):
         self.model_input = model_input
         self.batch_size = batch_size
         self.layer_size = layer_size
@@ -20,13 +25,14 @@ class LSTMmodel:
         self.output_dim = output_dim
         self.forget_bias = 1.0
         self.ground_truth = ground_truth
-        self.init_state = self.__init_state()
+        self.init_state = self.__init_state() if init_state is None else init_state
 
     def build_graph(self):
         with tf.variable_scope('lstm'):
-            lstm_cell = LSTMCell(self.layer_size)
-            rnn_cell = MultiRNNCell([lstm_cell] * self.layers)
-            cell_output, self.init_state = rnn_cell(self.model_input, self.init_state)
+            # the states of the layers concatenated, as the lanes of the batch are fed
+            lstm_cell = LSTMCell(self.layer_size, state_is_tuple=False)
+            rnn_cell = MultiRNNCell([lstm_cell] * self.layers, state_is_tuple=False)
+            cell_output, self.final_state = rnn_cell(self.model_input, self.init_state)
             print("%i layers created" % self.layers)
             self.output_layer = self.__add_output_layer("fc_out", cell_output, self.layer_size, self.output_dim)
             
@@ -49,8 +55,16 @@ class LSTMmodel:
             return tf.matmul(layer_input, fc_weights) + fc_biases
         
     
-    def add_loss(self, loss_weight):
-        self.loss = tf.reduce_sum(tf.pow(tf.matmul(self.output_layer - self.ground_truth, loss_weight), 2)) / self.batch_size
+    """
+    loss_mask -- optional weights of the lanes, [batch_size]; the loss is averaged over the lanes with a
+                 nonzero weight, so that padded lanes and frames without a label do not contribute
+    """
+    def add_loss(self, loss_weight, loss_mask=None):
+        lane_loss = tf.reduce_sum(tf.pow(tf.matmul(self.output_layer - self.ground_truth, loss_weight), 2), 1)
+        if loss_mask is None:
+            self.loss = tf.reduce_sum(lane_loss) / self.batch_size
+        else:
+            self.loss = tf.reduce_sum(lane_loss * loss_mask) / tf.maximum(tf.reduce_sum(loss_mask), 1.0)
         tf.scalar_summary('lstm_loss', self.loss)
         return self.loss
     
@@ -0,0 +1,79 @@
+"""
+In-process cache of decoded rgbd frames, keyed by (sequence directory, frame). The random windows of
+sequence_batch_itr overlap within and across epochs, frames which were decoded for one window are served
+from memory for the next ones instead of being decoded again. The cache is bounded by a budget of bytes,
+the least recently used frames are evicted first, so that it holds the whole data set if it fits into the
+budget and the most recently used part of it otherwise.
+"""
+
+from collections import OrderedDict
+import threading
+
+import numpy as np
+
+
+class MemoryFrameCache:
+    """
+    LRU cache of frames with a budget of max_bytes. It is shared by the prefetching threads, all methods
+    are serialized. Frames are stored as read-only copies, so that callers cannot change cached frames and
+    decode buffers can be reused after put().
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def get(self, key):
+        """
+        Returns the frame of key and marks it as most recently used, or None if it is not cached.
+        """
+        with self.lock:
+            frame = self.frames.pop(key, None)
+            if frame is None:
+                self.misses += 1
+                return None
+            self.frames[key] = frame
+            self.hits += 1
+            return frame
+
+    def put(self, key, frame):
+        """
+        Caches a copy of frame and evicts the least recently used frames until the cache fits its budget.
+        Frames which are larger than the budget are not cached.
+        """
+        if frame.nbytes > self.max_bytes:
+            return
+        frame = np.array(frame)
+        frame.flags.writeable = False
+        with self.lock:
+            previous = self.frames.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes
+            self.frames[key] = frame
+            self.bytes += frame.nbytes
+            while self.bytes > self.max_bytes:
+                _, evicted = self.frames.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns the counters of the cache: hits, misses, evictions, hit rate, cached frames and bytes.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': self.hits / float(lookups) if lookups else 0.0, 'frames': len(self.frames), 'bytes': self.bytes}
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.bytes = 0
@@ -1,10 +1,15 @@
 import json
+import os
+
+
+# the model config of the repository, found independently of the working directory
+CONFIG_FILE = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'resources', 'model.config'))
 
 
 class ModelConfigProvider:
     
-    def __init__(self):
-        with open('resources/model.config') as f:
+    def __init__(self, config_file=CONFIG_FILE):
+        with open(config_file) as f:
             contents = f.read()
         self.config = json.loads(contents, encoding='utf-8')
     
@@ -29,6 +34,9 @@ class ModelConfigProvider:
     def batch_size(self):
         return self.config['train']['model']['batch_size']
         
+    def lstm_lanes(self):
+        return self.config['train']['lstm']['lanes']
+        
     def learning_rate(self):
         return self.config['train']['model']['learning_rate']
 
@@ -41,8 +49,62 @@ class ModelConfigProvider:
     def base_log_dir(self):
         return self.config['train']['model']['base_log_dir']
 
-config_provider = ModelConfigProvider()
+    def frame_cache(self):
+        return self.config['train']['input']['frame_cache']
+    
+    def cache_dir(self):
+        return self.config['train']['input']['cache_dir']
+    
+    def prefetch_depth(self):
+        return self.config['train']['input']['prefetch_depth']
+    
+    def prefetch_workers(self):
+        return self.config['train']['input']['prefetch_workers']
+    
+    def decode_processes(self):
+        return self.config['train']['input']['decode_processes']
+    
+    def resize_method(self):
+        return self.config['train']['input']['resize_method']
+    
+    def depth_resize_method(self):
+        return self.config['train']['input']['depth_resize_method']
+    
+    def standardize(self):
+        return self.config['train']['input']['standardize']
+    
+    def frame_records(self):
+        return self.config['train']['input']['frame_records']
+    
+    def records_dir(self):
+        return self.config['train']['input']['records_dir']
+    
+    def records_encoded(self):
+        return self.config['train']['input']['records_encoded']
+    
+    def keyframe_overlap(self):
+        return self.config['train']['input']['keyframe_overlap']
+    
+    def memory_cache_mb(self):
+        return self.config['train']['input']['memory_cache_mb']
+    
+    def parallel_lanes(self):
+        return self.config['train']['input']['parallel_lanes']
+    
+    def strides(self):
+        return self.config['train']['input']['strides']
+    
+    def packed_batches(self):
+        return self.config['train']['input']['packed_batches']
+
+config_provider = None
 
 def get_config_provider():
+    """
+    Returns the config provider, reading the config on the first call.
+    """
+    global config_provider
+    if config_provider is None:
+        config_provider = ModelConfigProvider()
     return config_provider
     
@@ -1,141 +1,65 @@
-import bisect
-from fileinput import filename
+import functools
 import os
 import random
-from scipy import ndimage, misc
-from skimage import transform
-
+import threading
 import numpy as np
+from slam.network.batch_ring import BatchRing
+from slam.network.decode_pool import DecodePool
+from slam.network.frame_cache import FrameCache
+from slam.network.frame_records import decode_record, FrameRecords
+from slam.network.image_processing import read_rescaled_rgb_image, read_rgbd_image
+from slam.network.memory_cache import MemoryFrameCache
 from slam.network.model_config import get_config_provider
+from slam.network.posenet_cache import PoseNetCache
+from slam.network.prefetch import LaneIterator, PrefetchIterator
+from slam.preprocess.channel_stats import load_image_stats, read_sequence_stats
+from slam.preprocess.file_reader import read_stamped_file
+from slam.preprocess.frame_index import FRAME_TABLE_FILENAME, load_frame_table
+from slam.preprocess.keyframe_index import load_keyframes
+from slam.utils.file_utils import atomic_save, is_up_to_date
+from slam.utils import se3
 from slam.utils.logging_utils import get_logger
 from slam.utils.time_utils import time_it
-import tensorflow as tf
-
-def _quat_to_transformation(groundtruth):
-    t = groundtruth[0:3]
-    q = groundtruth[3:7]
-    q_x = q[0]
-    q_y = q[1]
-    q_z = q[2]
-    q_w = q[3]
-
-    trans = np.zeros((4, 4))
-    trans[0, 0] = q_w * q_w + q_x * q_x - q_y * q_y - q_z * q_z
-    trans[1, 0] = 2 * (q_x * q_y + q_w * q_z)
-    trans[2, 0] = 2 * (q_z * q_x - q_w * q_y)
-    trans[3, 0] = 0
-
-    trans[0, 1] = 2 * (q_x * q_y - q_w * q_z)
-    trans[1, 1] = q_w * q_w - q_x * q_x + q_y * q_y - q_z * q_z
-    trans[2, 1] = 2 * (q_y * q_z + q_w * q_x)
-    trans[3, 1] = 0
-
-    trans[0, 2] = 2 * (q_z * q_x + q_w * q_y)
-    trans[1, 2] = 2 * (q_y * q_z - q_w * q_x)
-    trans[2, 2] = q_w * q_w - q_x * q_x - q_y * q_y + q_z * q_z
-    trans[3, 2] = 0
-
-    trans[0, 3] = t[0]
-    trans[1, 3] = t[1]
-    trans[2, 3] = t[2]
-    trans[3, 3] = 1
-
-    return trans
-
-
-def _trans_to_twist(trans):
-    # compute angular velocities
-    if (np.trace(trans[0:3, 0:3]) - 1) / 2 > 1:
-        return np.zeros(6)
-
-    argument = (np.trace(trans[0:3, 0:3]) - 1) / 2
-    if np.abs(argument) > 1:
-        print "Warning: numerical issue in groundtruth transformation"
-        argument = 1 * argument / np.abs(argument)
-    w_abs = np.arccos(argument)
-    w = np.zeros(3)
-    w[0] = 1 / (2 * np.sin(w_abs)) * (trans[2, 1] - trans[1, 2]) * w_abs
-    w[1] = 1 / (2 * np.sin(w_abs)) * (trans[0, 2] - trans[2, 0]) * w_abs
-    w[2] = 1 / (2 * np.sin(w_abs)) * (trans[1, 0] - trans[0, 1]) * w_abs
-
-    w_hat = np.zeros((3, 3))
-    w_hat[0] = [0, -w[2], w[1]]
-    w_hat[1] = [w[2], 0, -w[0]]
-    w_hat[2] = [-w[1], w[0], 0]
-
-    w_abs = np.linalg.norm(w)
-
-    if w_abs == 0:
-        return np.zeros(6)
-
-    w = np.matrix(w)
-    w_hat = np.matrix(w_hat)
-    omega = (np.matrix((np.eye(3) - trans[0:3, 0:3])) * w_hat + w * np.transpose(w)) / (w_abs * w_abs)
-    v = np.transpose(np.linalg.inv(omega) * np.transpose(np.matrix(trans[0:3, 3])))
-
-    return np.concatenate((v, w), 1)
-
-
-def _inverse_trans(trans):
-    inv_trans = np.zeros((4, 4))
-    inv_trans[0:3, 0:3] = np.transpose(trans[0:3, 0:3])
-    inv_trans[0:3, 3] = np.squeeze(-np.matrix(inv_trans[0:3, 0:3]) * np.transpose(np.matrix(trans[0:3, 3])))
-    inv_trans[3, 3] = 1
-    
-    return inv_trans
-
-
-def _twist_to_trans(twist):
-    v = np.matrix(twist[0:3])
-    w = np.matrix(twist[3:6])
-    w_abs = np.linalg.norm(w)
-    w_hat = np.zeros((3, 3))
-    w_hat[0] = [0, -w[0, 2], w[0, 1]]
-    w_hat[1] = [w[0, 2], 0, -w[0, 0]]
-    w_hat[2] = [-w[0, 1], w[0, 0], 0]
-    w_hat = np.matrix(w_hat)
-
-    rot = np.eye(3) + w_hat / w_abs * np.sin(w_abs) + w_hat * w_hat / (w_abs * w_abs) * (1 - np.cos(w_abs))
-
-    trans = (np.matrix((np.eye(3) - rot)) * w_hat * np.transpose(v) + np.transpose(w) * w * np.transpose(v)) / (w_abs * w_abs)
-
-    tr = np.zeros((4, 4))
-    tr[0:3, 0:4] = np.concatenate((rot, trans), 1)
-    tr[3, 3] = 1
 
-    return tr
 
+# increase the version when the computation of the labels changes
+LABELS_FILENAME = 'twist_labels_v3.npy'
 
-def _transform_pointcloud(pointcloud, trans):
-        return np.dot(pointcloud, transform[0:3, 0:3]) + transform[0:3, 3]
+# maximal size of the block of records read at once for a window of a lane
+RECORD_BLOCK_BYTES = 16 * 2 ** 20
 
+def load_poses(frame_table):
+    """
+    Returns the absolute groundtruth poses of the frames of a sequence as transformations of shape [n, 4, 4].
+    The quaternions of the groundtruth files are rounded, they are normalized first.
+    """
+    poses = np.array(frame_table.groundtruth_poses(), dtype=np.float64)
+    poses[:, 3:7] /= np.linalg.norm(poses[:, 3:7], axis=1)[:, None]
+    return se3.quaternion_to_transformation(poses)
 
-def _overlap(backtransform):
-    dim = [224.0, 224.0]
-    c = 0.0
-    for i in range(backtransform.shape[0]):
-        if dim[0] >= backtransform[i, 0] >= 0 and dim[1] >= backtransform[i, 1] >= 0:
-            c += 1
-    return c / backtransform.shape[0]
+def _twist_labels(frame_table):
+    # the twist of every frame relative to the previous one
+    poses = load_poses(frame_table)
+    twist = np.zeros((len(poses), 6))
+    twist[1:] = se3.log(se3.relative(poses[:-1], poses[1:]))
+    return twist
 
 
-def _find_label(groundtruth, timestamp):
-    return bisect.bisect_left(groundtruth, timestamp)
+def load_twist_labels(seq_dir, frame_table):
+    """
+    Returns the twist labels of the frames of a sequence. They are computed once and stored as
+    LABELS_FILENAME next to the frame table, until the frame table or the groundtruth changes.
+    """
+    labels_file = os.path.join(seq_dir, LABELS_FILENAME)
+    if not is_up_to_date(labels_file, [os.path.join(seq_dir, FRAME_TABLE_FILENAME), os.path.join(seq_dir, 'groundtruth.txt')]):
+        with atomic_save(labels_file) as tmp_file:
+            np.save(tmp_file, _twist_labels(frame_table))
+    return np.load(labels_file)
 
 
 class QueuedInputProvider:
     
     BASE_DATA_DIR = '/home/sanjeev/data/'  # '/usr/data/rgbd_datasets/tum_rgbd_benchmark/'
-    # focal length x fr1/fr2/fr3
-    FX = [517.3, 520.9, 535.4]
-    # focal length y
-    FY = [516.5, 521.0, 539.2]
-    # optical center x
-    CX = [318.6, 325.1, 320.1]
-    # optical center y
-    CY = [255.3, 249.7, 247.6]
-    # 16-bit PNG files
-    FACTOR = 1
     
     def __init__(self):
         self.config_provider = get_config_provider()
@@ -152,6 +76,7 @@ class QueuedInputProvider:
     outparam_batch: Labels. 1D tensor of [batch_size] size.
     """    
     def get_training_batch(self):
+        import tensorflow as tf
         self.logger.info('Going to create batch of images and ground truths')
         images_batch = []
         groundtruth_batch = []
@@ -159,10 +84,9 @@ class QueuedInputProvider:
         for filename in self.training_filenames:
             self.logger.info('Creating input queue for training sample at:{}'.format(filename))
             
-            associations = np.loadtxt(os.path.join(filename, "associate.txt"), dtype="str", unpack=False)
-            groundtruth = np.loadtxt(os.path.join(filename, "groundtruth.txt"), dtype="str", unpack=False)
+            frame_table = load_frame_table(filename)
 
-            twist, rgb_filepaths, depth_filepaths = self._get_data(associations, groundtruth, sequence_length)
+            twist, rgb_filepaths, depth_filepaths = self._get_data(frame_table, sequence_length)
 
             rgb_filepaths = [os.path.join(filename, filepath) for filepath in rgb_filepaths]
             depth_filepaths = [os.path.join(filename, filepath) for filepath in depth_filepaths]
@@ -183,6 +107,7 @@ class QueuedInputProvider:
      Returns the rgbd tensor and output parameters tensor after reading from file name queue.
     """
     def read_rgbd_data(self, input_queue):
+        import tensorflow as tf
         # original input size
         width_original = 480
         height_original = 640
@@ -219,85 +144,27 @@ class QueuedInputProvider:
     def get_batch_size(self):
         return self.batch_size
 
-    def _point_cloud(self, depth_image, dataset_int):
-        pointcloud = np.zeros((depth_image.shape[0] * depth_image.shape[1], 3))
-        for v in range(depth_image.shape[0]):
-            for u in range(depth_image.shape[1]):
-                pointcloud[u * v, 2] = depth_image[v, u] / self.FACTOR
-                pointcloud[u * v, 0] = (u - self.CX[dataset_int - 1]) * pointcloud[u * v, 2] / self.FX[dataset_int - 1]
-                pointcloud[u * v, 1] = (v - self.CY[dataset_int - 1]) * pointcloud[u * v, 2] / self.FY[dataset_int - 1]
-        return pointcloud[np.all(pointcloud != 0.0, 1)]
-
-    def _backtransform_pointcloud(self, pointcloud, dataset_int):
-        uvd = np.zeros(pointcloud.shape)
-        uvd[:, 2] = pointcloud[:, 2]
-        uvd[:, 0] = pointcloud[:, 0] * self.FX[dataset_int - 1] / uvd[:, 2] + self.CX[dataset_int - 1]
-        uvd[:, 1] = pointcloud[:, 1] * self.FY[dataset_int - 1] / uvd[:, 2] + self.CY[dataset_int - 1]
-        return uvd
-
     """
     Return Twist and Filepaths
     dynamic drop -> images where the overlap is greater than the specified value are dropped (has to be between 0.0 and 1.0)
     static drop -> a fixed number of images is dropped
     """
-    def _get_data(self, associations, groundtruth, sequence_length, dynamic_drop=0.0, static_drop=1):
-        # select every nth image
-        associations = associations[0::static_drop]
-        # define filepaths
-        rgb_filepaths = associations[:, 1]
-        depth_filepaths = associations[:, 3]
-
-        # set dataset length
-        dataset_length = associations.shape[0]
-
-        # initialize twist and old transformation
-        twist = np.zeros((dataset_length, 6))
-        trans_old = np.zeros((4, 4))
-
+    def _get_data(self, frame_table, sequence_length, dynamic_drop=0.0, static_drop=1):
         # check if dynamic drop is chosen
         drop = 0.0 < dynamic_drop <= 1.0
 
-        delete_list = []
-        pointcloud_old = None
-        for i in range(dataset_length):
-            # get quaternion
-            quat = groundtruth[:, 1:][_find_label(groundtruth[:, 0], associations[i, 0])].astype(np.float32)
-            # compute transformation matrix from quaternion
-            trans_new = _quat_to_transformation(quat)
-            if drop:
-                # compute pointcloud if dynamic drop is chosen
-                pointcloud = self._point_cloud(misc.imread(os.path.join(filename, associations[i, 3])), 1)
-            if i > 0:
-                # compute relative transformation matrix
-                relative_trans = np.dot(_inverse_trans(trans_old), trans_new)
-                if drop:
-                    # transform old pointcloud if drop is chosen
-                    transformed_pointcloud = _transform_pointcloud(pointcloud_old, relative_trans)
-                    # transform pointcloud back into (u,v,d)
-                    back = self._backtransform_pointcloud(transformed_pointcloud, 1)
-                    # compute overlap with current image
-                    overlap = _overlap(back, [640, 480])
-                    print overlap
-
-                    if overlap < dynamic_drop:
-                        # set twist, if overlap is smaller than maximal overlap
-                        twist[i] = _trans_to_twist(relative_trans)
-                    else:
-                        delete_list.append(i)
-                else:
-                    twist[i] = _trans_to_twist(relative_trans)
-            if i == 0 or (drop and overlap < dynamic_drop):
-                # set old transformation to new transformation if image is not dropped
-                trans_old = trans_new
-            if drop:
-                # set old pointcloud to new pointcloud
-                pointcloud_old = pointcloud
-
         if drop:
-            # delete dropped files
-            twist = np.delete(twist, delete_list, 0)
-            rgb_filepaths = np.delete(rgb_filepaths, delete_list, 0)
-            depth_filepaths = np.delete(depth_filepaths, delete_list, 0)
+            # keyframes and their twists relative to the previous keyframe from the keyframe index
+            frames, twist = load_keyframes(frame_table.seq_dir, dynamic_drop, static_drop)
+        else:
+            # select every nth image, all frames are relative to the first one
+            frames = np.arange(0, len(frame_table), static_drop)
+            trans = se3.quaternion_to_transformation(frame_table.groundtruth_poses()[frames])
+            twist = np.zeros((len(frames), 6))
+            twist[1:] = se3.log(se3.relative(trans[0], trans[1:]))
+        # define filepaths
+        rgb_filepaths = frame_table.rgb_filenames()[frames]
+        depth_filepaths = frame_table.depth_filenames()[frames]
 
         # set dataset length
         dataset_length = twist.shape[0]
@@ -314,7 +181,7 @@ class QueuedInputProvider:
         rgb_filepaths = rgb_filepaths[start_point:start_point + sequence_length]
         depth_filepaths = depth_filepaths[start_point:start_point + sequence_length]
 
-        self.logger.info('The size of dataset:{} is {}'.format(filename, twist.shape[0]))
+        self.logger.info('The size of dataset:{} is {}'.format(frame_table.seq_dir, twist.shape[0]))
 
         return twist, rgb_filepaths, depth_filepaths
 
@@ -322,94 +189,335 @@ class QueuedInputProvider:
 class SimpleInputProvider:
 
     class SequenceBatch:
+        """
+        The rgbd frames and groundtruths of a batch are written into a slot of the BatchRing of its iterator
+        as they are loaded: images is a float32 array of shape [batch_size, height, width, 4], normalized with
+        the channel statistics of the training sequences, and groundtruths a float32 array of shape
+        [batch_size, 6]. Both are fed as they are and reused for a later batch of the iterator.
+        
+        valid marks the lanes which hold a frame, the other ones are padding with zero images and labels and
+        no filenames. reset marks the lanes whose frame is the first one of a window, their state has to be
+        reset before it is fed.
+        """
         
-        def __init__(self):
+        def __init__(self, images, groundtruths, valid, reset):
             self.rgb_filenames = []
             self.depth_filenames = []
-            self.rgbd_images = []
-            self.groundtruths = []
+            self.images = images
+            self.groundtruths = groundtruths
+            self.valid = valid
+            self.reset = reset
+        
+        def feed_images(self, out=None):
+            if out is None:
+                return self.images
+            out[...] = self.images
+            return out
         
     class SequenceBatchIterator:
     
-        def __init__(self, input_provider, seqdir_vs_offset, sequence_length):
+        def __init__(self, input_provider, lanes, sequence_length, batch_ring=None):
+            """
+            lanes -- windows (seq_dir, offset, stride, length) of every lane, which are read one after another;
+                     a window reads length frames, every stride-th one from offset on. Lanes shorter than
+                     sequence_length are padded.
+            """
             self.counter = 0
-            self.seqdir_vs_offset = seqdir_vs_offset
+            if batch_ring is None:
+                batch_ring = BatchRing(2, len(lanes))
+            self.batch_ring = batch_ring
+            self.lanes = lanes
             self.input_provider = input_provider
             self.sequence_length = sequence_length
             self.logger = get_logger()
+            
+            # sequence and offset of the frame of every lane and step, and the twists of the frames relative to the
+            # frame stride frames before, computed for whole windows
+            self.seq_dirs = [[None] * sequence_length for _ in lanes]
+            self.offsets = np.zeros((len(lanes), sequence_length), dtype=np.int64)
+            self.valid = np.zeros((len(lanes), sequence_length), dtype=bool)
+            self.reset = np.zeros((len(lanes), sequence_length), dtype=bool)
+            self.groundtruths = np.zeros((len(lanes), sequence_length, 6))
+            # the first and last frame of the window of every lane and step, the blocks of records are read within
+            self.window_starts = np.zeros((len(lanes), sequence_length), dtype=np.int64)
+            self.window_ends = np.zeros((len(lanes), sequence_length), dtype=np.int64)
+            for lane, windows in enumerate(lanes):
+                start = 0
+                for seq_dir, offset, stride, length in windows:
+                    offsets = offset + stride * np.arange(length)
+                    self.seq_dirs[lane][start:start + length] = [seq_dir] * length
+                    self.offsets[lane, start:start + length] = offsets
+                    self.valid[lane, start:start + length] = True
+                    self.reset[lane, start] = True
+                    self.groundtruths[lane, start:start + length] = input_provider.get_ground_truths(seq_dir, offsets, stride)
+                    frame_indices = input_provider._sequence(seq_dir)['frame_indices']
+                    self.window_starts[lane, start:start + length] = frame_indices[offsets[0]]
+                    self.window_ends[lane, start:start + length] = frame_indices[offsets[-1]]
+                    start += length
+            
+            # the records of every lane are read in blocks up to the end of its window and served from there
+            self.record_blocks = {}
+            self.record_locks = [threading.Lock() for _ in lanes]
         
         def __iter__(self):
             return self
         
-        @time_it
         def next(self):
-            self.logger.debug('Going to fetch next batch of frames. batch size:{}, frame no.:{} '.format(len(self.seqdir_vs_offset), self.counter))
-            sequence_batch = SimpleInputProvider.SequenceBatch()
             if self.counter < self.sequence_length:
-                for i, ele in enumerate(self.seqdir_vs_offset):
-                    seqdir = ele[0]
-                    offset = ele[1]
-                    rgb_filename, depth_filename, rgbd_file = self.input_provider.get_rgbd_file(seqdir, offset)
-                    groundtruth = self.input_provider.get_ground_truth(seqdir, offset)
-                    
-                    sequence_batch.rgbd_images.append(rgbd_file)
-                    sequence_batch.groundtruths.append(groundtruth)
-                    sequence_batch.rgb_filenames.append(rgb_filename)
-                    sequence_batch.depth_filenames.append(depth_filename)
-                    self.seqdir_vs_offset[i][1] = offset + 1
-                mean = get_mean(sequence_batch.rgbd_images, channels=4)
-                self.logger.info('Mean for current batch:{}'.format(mean))
-                sequence_batch.rgbd_images = [rgbd_image - mean for rgbd_image in sequence_batch.rgbd_images]
+                sequence_batch = self.load_batch(self.counter)
                 self.counter += 1
                 return sequence_batch
             else:
                 raise StopIteration()
         
+        """
+        Returns the batch of the frame number counter of all sequences. It does not depend on the 
+        state of the iterator, so that batches can be loaded ahead by a PrefetchIterator.
+        """
+        @time_it
+        def load_batch(self, counter):
+            self.logger.debug('Going to fetch next batch of frames. batch size:{}, frame no.:{} '.format(len(self.lanes), counter))
+            valid_lanes = np.flatnonzero(self.valid[:, counter])
+            seqdir_vs_frame = [(self.seq_dirs[lane][counter], self.offsets[lane, counter]) for lane in valid_lanes]
+            read_records = [functools.partial(self.read_record, lane, counter) for lane in valid_lanes]
+            frames = [None] * len(self.lanes)
+            if seqdir_vs_frame:
+                for lane, frame in zip(valid_lanes, zip(*self.input_provider.get_rgbd_files(seqdir_vs_frame, read_records))):
+                    frames[lane] = frame
+            return self.assemble_batch(counter, frames)
+        
+        """
+        Returns the frame number counter of one lane of the batch as (rgb filename, depth filename, rgbd frame),
+        or None if the lane is padding at this frame. The lanes of a batch can be loaded in parallel and
+        combined by assemble_batch.
+        """
+        def load_lane(self, lane, counter):
+            if not self.valid[lane, counter]:
+                return None
+            return self.input_provider.get_rgbd_file(self.seq_dirs[lane][counter], self.offsets[lane, counter],
+                                                     functools.partial(self.read_record, lane, counter))
+        
+        """
+        Returns the record of a frame of the sequence of one lane at the frame number counter. The records of
+        its window are read at once, at most RECORD_BLOCK_BYTES of them, and the following frames of the window
+        are served from this block. A block starts at the first frame of the window if it reaches the frame, so
+        that frames which prefetching workers load out of order are served from it as well, otherwise at the
+        frame.
+        """
+        def read_record(self, lane, counter, frame):
+            records = self.input_provider._sequence(self.seq_dirs[lane][counter])['records']
+            with self.record_locks[lane]:
+                block = self.record_blocks.get(lane)
+                if block is None or block[0] is not records or not block[1] <= frame < block[1] + len(block[2]):
+                    start, end = self.window_starts[lane, counter], self.window_ends[lane, counter]
+                    count = records.count_within(start, end - start + 1, RECORD_BLOCK_BYTES)
+                    if start + count <= frame:
+                        start = frame
+                        count = records.count_within(start, end - start + 1, RECORD_BLOCK_BYTES)
+                    block = (records, start, records.read(start, count))
+                    self.record_blocks[lane] = block
+                return block[2][frame - block[1]]
+        
+        def assemble_batch(self, counter, frames):
+            images, groundtruths = self.batch_ring.slot(counter)
+            groundtruths[...] = self.groundtruths[:, counter]
+            sequence_batch = SimpleInputProvider.SequenceBatch(images, groundtruths, self.valid[:, counter], self.reset[:, counter])
+            for i, frame in enumerate(frames):
+                if frame is None:
+                    images[i] = 0
+                    sequence_batch.rgb_filenames.append(None)
+                    sequence_batch.depth_filenames.append(None)
+                    continue
+                rgb_filename, depth_filename, rgbd_file = frame
+                # copied into the ring out of the frame cache and the decode buffers and normalized in place, which
+                # is faster than a subtraction with the uint8 frame as input
+                images[i] = rgbd_file
+                images[i] -= self.input_provider.mean
+                if self.input_provider.scale is not None:
+                    images[i] *= self.input_provider.scale
+                sequence_batch.rgb_filenames.append(rgb_filename)
+                sequence_batch.depth_filenames.append(depth_filename)
+            return sequence_batch
+        
     BASE_DATA_DIR = '/usr/data/rgbd_datasets/tum_rgbd_benchmark/'  # '/home/sanjeev/data/'
     
-    def __init__(self, filename_provider):
+    def __init__(self, filename_provider, channel_stats, frame_cache=None, prefetch_depth=0, prefetch_workers=1, decode_pool=None,
+                 resize_method='skimage', depth_resize_method=None, standardize=False, frame_records=None, keyframe_overlap=0.0,
+                 memory_cache=None, parallel_lanes=False, strides=None, packed=False):
+        """
+        channel_stats -- statistics the frames are normalized with, those of the training sequences also when
+                         the provider reads the test sequences, see training_channel_stats
+        strides -- strides at which the windows of sequence_batch_itr read the frames, every window uses one
+                   of them at random (default: 1)
+        packed -- sequence_batch_itr packs windows of short sequences into the lanes, see packed_batch_itr
+        """
         training_filenames = filename_provider()
+        self.strides = strides or [1]
+        self.packed = packed
+        self.parallel_lanes = parallel_lanes
+        self.batch_rings = {}
+        self.batch_iterator = None
+        self.memory_cache = memory_cache
+        self.keyframe_overlap = keyframe_overlap
+        self.frame_records = frame_records
+        self.resize_method = resize_method
+        self.depth_resize_method = depth_resize_method
+        self.frame_cache = frame_cache
+        self.decode_pool = decode_pool
+        self.prefetch_depth = prefetch_depth
+        self.prefetch_workers = prefetch_workers
+        self.logger = get_logger()
         self.sequence_dirs = [os.path.join(self.BASE_DATA_DIR, filename) for filename in training_filenames]
         
+        # sequences are loaded on their first use
         self.seq_dir_map = {}
+        self.seq_dir_lock = threading.Lock()
         
-        for seq_dir in self.sequence_dirs:
-            associations = np.loadtxt(os.path.join(seq_dir, "associate.txt"), dtype="str", unpack=False)
-            groundtruth = np.loadtxt(os.path.join(seq_dir , "groundtruth.txt"), dtype="str", unpack=False)
-            if seq_dir not in self.seq_dir_map:
-                self.seq_dir_map[seq_dir] = {}
-            self.seq_dir_map[seq_dir]['associations'] = associations
-            self.seq_dir_map[seq_dir]['groundtruth'] = groundtruth
-            
-            sequence_size = associations.shape[0]
-            twist = np.zeros((sequence_size, 6))
-            trans_old = np.zeros((4, 4))
-            for i in range(sequence_size):
-                quat = groundtruth[:, 1:][_find_label(groundtruth[:, 0], associations[i, 0])].astype(np.float32)
-                trans_new = _quat_to_transformation(quat)
-                if i > 0:
-                    twist[i] = _trans_to_twist(trans_new)
-                else:
-                    twist[i] = np.zeros(6)
-                trans_old = trans_new
+        # frames are normalized with the statistics of the training sequences, divided by the std if standardize is set
+        self.logger.info('Channel mean:{}, std:{}'.format(channel_stats['mean'], channel_stats['std']))
+        self.mean = np.array(channel_stats['mean'], dtype=np.float32)
+        self.scale = None
+        if standardize:
+            self.scale = 1.0 / np.maximum(np.array(channel_stats['std'], dtype=np.float32), 1e-6)
             
-            self.seq_dir_map[seq_dir]['relpos'] = twist
-            
-    def sequence_batch_itr(self, sequence_length, batch_size):
+    """
+    Returns the frame table, absolute poses and cached frames or records of a sequence, loading them on the
+    first call. If keyframe_overlap is set, only the keyframes of the sequence are used and offsets refer to
+    the keyframes.
+    """
+    def _sequence(self, seq_dir):
+        with self.seq_dir_lock:
+            if seq_dir not in self.seq_dir_map:
+                self.seq_dir_map[seq_dir] = self._load_sequence(seq_dir)
+            return self.seq_dir_map[seq_dir]
+    
+    """
+    Loads the sequences again on their next use, e.g. to pick up the frames which a StreamingFrameTable
+    appended to the frame table of a sequence which is still being recorded.
+    """
+    def refresh_sequences(self):
+        with self.seq_dir_lock:
+            self.seq_dir_map.clear()
+    
+    def _load_sequence(self, seq_dir):
+        sequence = {}
+        frame_table = load_frame_table(seq_dir)
+        sequence['frames'] = frame_table
+        
+        # the labels of any stride are computed from the absolute poses
+        sequence['poses'] = load_poses(frame_table)
+        if self.frame_cache:
+            rgbd_frames, _ = self.frame_cache.load(seq_dir, load_twist_labels(seq_dir, frame_table))
+            sequence['rgbd'] = rgbd_frames
+        elif self.frame_records:
+            sequence['records'] = self.frame_records.load(seq_dir, load_twist_labels(seq_dir, frame_table))
+        
+        sequence['frame_indices'] = np.arange(len(frame_table))
+        if self.keyframe_overlap > 0:
+            sequence['frame_indices'], _ = load_keyframes(seq_dir, self.keyframe_overlap)
+            # windows longer than the keyframes of a sequence are not drawn from it, see sequence_batch_itr
+            self.logger.info('Sequence {}: {} keyframes of {} frames at overlap {}'.format(
+                             seq_dir, len(sequence['frame_indices']), len(frame_table), self.keyframe_overlap))
+        return sequence
+    
+    """
+    Returns an iterator over the batches of windows of sequence_length frames of random sequences. Every
+    window reads every stride-th frame, with the given stride or with one of the strides of the provider
+    chosen at random per window. Sequences shorter than sequence_length are skipped, packed_batch_itr
+    packs their frames instead. If packed is set, or by default if the provider packs batches, the windows
+    are packed by packed_batch_itr.
+    """
+    def sequence_batch_itr(self, sequence_length, batch_size, stride=None, packed=None):
+        if self.memory_cache is not None:
+            self.logger.info('Memory frame cache:{}'.format(self.memory_cache.stats()))
+        if packed is None:
+            packed = self.packed
+        if packed:
+            return self.packed_batch_itr(sequence_length, batch_size, stride)
         random.shuffle(self.sequence_dirs)
-        training_sequences = self.sequence_dirs
-        total_sequences = len(training_sequences)
-        seqdir_vs_offset = []
+        training_sequences = []
+        short_sequences = []
+        for seq_dir in self.sequence_dirs:
+            if len(training_sequences) == batch_size:
+                break
+            total_frames = len(self._sequence(seq_dir)['frame_indices'])
+            if total_frames < sequence_length:
+                short_sequences.append('{} ({} frames)'.format(seq_dir, total_frames))
+            else:
+                training_sequences.append((seq_dir, total_frames))
+        if short_sequences:
+            self.logger.info('Skipping sequences shorter than {} frames:{}'.format(sequence_length, short_sequences))
+        if not training_sequences:
+            raise ValueError('No sequence has {} frames for a window, use packed batches for the sequences:{}'.format(
+                             sequence_length, short_sequences))
+        lanes = []
         for i in xrange(batch_size):
-            seq_dir = training_sequences[i % total_sequences]
-            associations = self.seq_dir_map[seq_dir]['associations']
-            total_frames = len(associations)
-            offset = random.randint(0, total_frames - sequence_length)
-            seqdir_vs_offset.append([seq_dir, offset])
+            seq_dir, total_frames = training_sequences[i % len(training_sequences)]
+            window_stride = self._window_stride(seq_dir, total_frames, sequence_length, stride)
+            offset = random.randint(0, total_frames - 1 - (sequence_length - 1) * window_stride)
+            lanes.append([(seq_dir, offset, window_stride, sequence_length)])
             
-        input_batch = self.SequenceBatchIterator(self, seqdir_vs_offset, sequence_length)
-        return input_batch
+        return self._batch_iterator(lanes, sequence_length)
     
+    def _window_stride(self, seq_dir, total_frames, sequence_length, stride=None):
+        """
+        Returns the given stride or one of the strides of the provider at random, among those at which a
+        window of sequence_length frames fits into a sequence of total_frames frames, or the largest stride
+        which fits if none of them does. Raises a ValueError if the window does not fit at any stride.
+        """
+        strides = [stride] if stride else self.strides
+        fitting = [window_stride for window_stride in strides if (sequence_length - 1) * window_stride < total_frames]
+        if fitting:
+            return random.choice(fitting)
+        if total_frames < sequence_length:
+            raise ValueError('Sequence {} has {} frames, too few for a window of {}'.format(seq_dir, total_frames, sequence_length))
+        return max((total_frames - 1) // max(sequence_length - 1, 1), 1)
+    
+    """
+    Returns an iterator over batches of lanes which are packed with windows of random sequences. A window
+    holds sequence_length frames, or all frames of a sequence which is shorter. The windows are packed into
+    the lanes by their length, so that short sequences follow each other in a lane and share the batch with
+    long ones; SequenceBatch.reset marks the first frame of every window. Lanes which are not filled
+    completely are padded, SequenceBatch.valid marks the lanes with a frame. Padded frames are neither read
+    nor decoded and the iterator ends with the longest lane.
+    """
+    def packed_batch_itr(self, sequence_length, batch_size, stride=None):
+        random.shuffle(self.sequence_dirs)
+        training_sequences = [seq_dir for seq_dir in self.sequence_dirs if len(self._sequence(seq_dir)['frame_indices']) > 0]
+        if not training_sequences:
+            raise ValueError('No frames in the sequences:{}'.format(self.sequence_dirs))
+        windows = []
+        # windows of the sequences in turn, until they fill the lanes
+        while sum(window[3] for window in windows) < sequence_length * batch_size:
+            seq_dir = training_sequences[len(windows) % len(training_sequences)]
+            total_frames = len(self._sequence(seq_dir)['frame_indices'])
+            window_stride = stride or random.choice(self.strides)
+            length = min(sequence_length, (total_frames - 1) // window_stride + 1)
+            offset = random.randint(0, total_frames - 1 - (length - 1) * window_stride)
+            windows.append((seq_dir, offset, window_stride, length))
+        
+        lanes = [[windows[i] for i in lane] for lane in self.pack_windows([window[3] for window in windows], batch_size, sequence_length)]
+        packed_length = max(sum(window[3] for window in lane) for lane in lanes)
+        self.logger.info('Packed {} of {} windows into {} lanes of {} frames, {:.1%} padding'.format(
+                         sum(len(lane) for lane in lanes), len(windows), batch_size, packed_length,
+                         1 - sum(window[3] for lane in lanes for window in lane) / float(batch_size * packed_length)))
+        return self._batch_iterator(lanes, packed_length)
+    
+    """
+    Packs windows of the given lengths into lanes of capacity frames, first fit in the order of decreasing
+    length. Returns the indices of the windows of every lane, windows which fit into no lane are left out.
+    """
+    @staticmethod
+    def pack_windows(lengths, lanes, capacity):
+        free = [capacity] * lanes
+        packed = [[] for _ in xrange(lanes)]
+        for index in sorted(xrange(len(lengths)), key=lambda index: -lengths[index]):
+            for lane in xrange(lanes):
+                if lengths[index] <= free[lane]:
+                    packed[lane].append(index)
+                    free[lane] -= lengths[index]
+                    break
+        return packed
     
     """
     Randomly selects one sequence out of all sequences and returns all frames of the sequence.
@@ -418,94 +526,225 @@ class SimpleInputProvider:
         random.shuffle(self.sequence_dirs)
         training_sequences = self.sequence_dirs
         seq_dir = training_sequences[0]
-        associations = self.seq_dir_map[seq_dir]['associations']
-        total_frames = len(associations)
-        seqdir_vs_offset = [[seq_dir, 0]]
-        input_batch = self.SequenceBatchIterator(self, seqdir_vs_offset, total_frames)
-        return input_batch
+        total_frames = len(self._sequence(seq_dir)['frame_indices'])
+        return self._batch_iterator([[(seq_dir, 0, 1, total_frames)]], total_frames)
     
-    def get_rgbd_file(self, dirname, offset):
-        associations = self.seq_dir_map[dirname]['associations']
-        
-        if associations[offset, 1].startswith('depth'):
-            rgb_filename = os.path.join(dirname, associations[offset, 3])
-            depth_filename = os.path.join(dirname, associations[offset, 1])
+    """
+    Returns a SequenceBatchIterator, or a PrefetchIterator over its batches if prefetching is enabled. With
+    parallel_lanes every sequence of the batch is read in order by its own worker instead, unless the frames
+    are decoded by the decode pool, which decodes the frames of a batch in parallel already.
+    
+    The batches are written into a BatchRing of the provider, which is reused by the next iterator; the
+    previous iterator is closed, so that none of its workers writes into the ring any more.
+    """
+    def _batch_iterator(self, lanes, sequence_length):
+        if hasattr(self.batch_iterator, 'close'):
+            self.batch_iterator.close()
+        parallel = self.parallel_lanes and len(lanes) > 1 and self.decode_pool is None
+        # the batch which is fed and the ones loaded ahead by prefetching
+        slots = 2 if parallel or self.prefetch_depth == 0 else self.prefetch_depth + 2
+        batch_ring = self._batch_ring(slots, len(lanes))
+        input_batch = self.SequenceBatchIterator(self, lanes, sequence_length, batch_ring)
+        if parallel:
+            self.batch_iterator = LaneIterator(input_batch.load_lane, input_batch.assemble_batch, len(lanes), sequence_length,
+                                               max(self.prefetch_depth, 1))
+        elif self.prefetch_depth > 0:
+            self.batch_iterator = PrefetchIterator(input_batch.load_batch, sequence_length, self.prefetch_depth, self.prefetch_workers)
         else:
-            rgb_filename = os.path.join(dirname, associations[offset, 1])
-            depth_filename = os.path.join(dirname, associations[offset, 3])
-       
-        rgb_img = ndimage.imread(rgb_filename)
-        depth_img = ndimage.imread(depth_filename)
-        width = height = 224
-
-        # Reshape
-        depth_img = np.reshape(depth_img, list(depth_img.shape) + [1])
-        depth_img = 255 * depth_img / np.max(depth_img)
-
-        rgbd_img = np.concatenate((rgb_img, depth_img), 2)
-
-        # Resize
-        rgbd_img = transform.resize(rgbd_img, [width, height], preserve_range=True)
-
-        return rgb_filename, depth_filename, rgbd_img.astype(np.float32)
+            self.batch_iterator = input_batch
+        return self.batch_iterator
+    
+    def _batch_ring(self, slots, batch_size):
+        if (slots, batch_size) not in self.batch_rings:
+            self.batch_rings[(slots, batch_size)] = BatchRing(slots, batch_size)
+        return self.batch_rings[(slots, batch_size)]
+    
+    def _get_filenames(self, dirname, offset):
+        sequence = self._sequence(dirname)
+        frame = sequence['frame_indices'][offset]
+        rgb_filename = os.path.join(dirname, sequence['frames'].rgb_filename(frame))
+        depth_filename = os.path.join(dirname, sequence['frames'].depth_filename(frame))
+        return rgb_filename, depth_filename
+    
+    """
+    Returns the rgb filenames, depth filenames and rgbd images of a list of (dirname, offset) pairs. Frames 
+    which are neither cached nor recorded are taken from the memory cache if there is one, the remaining
+    ones are decoded by the decode pool if there is one. read_records optionally gives a function per pair
+    which returns the record of a frame, e.g. from a block of records read ahead, see get_rgbd_file.
+    """
+    def get_rgbd_files(self, dirname_vs_offset, read_records=None):
+        if self.decode_pool is None or all('rgbd' in self._sequence(dirname) or 'records' in self._sequence(dirname)
+                                           for dirname, _ in dirname_vs_offset):
+            read_records = read_records or [None] * len(dirname_vs_offset)
+            rgbd_files = [self.get_rgbd_file(dirname, offset, read_record)
+                          for (dirname, offset), read_record in zip(dirname_vs_offset, read_records)]
+            return [rgbd_file[0] for rgbd_file in rgbd_files], [rgbd_file[1] for rgbd_file in rgbd_files], [rgbd_file[2] for rgbd_file in rgbd_files]
+        filenames = [self._get_filenames(dirname, offset) for dirname, offset in dirname_vs_offset]
+        keys = [self._memory_cache_key(dirname, offset) for dirname, offset in dirname_vs_offset]
+        rgbd_images = [self._get_cached_frame(key) for key in keys]
+        # only the frames which are not in the memory cache are decoded
+        missing = [i for i, rgbd_image in enumerate(rgbd_images) if rgbd_image is None]
+        if missing:
+            for i, rgbd_image in zip(missing, self.decode_pool.decode([filenames[i] for i in missing])):
+                self._put_cached_frame(keys[i], rgbd_image)
+                rgbd_images[i] = rgbd_image
+        return [filename[0] for filename in filenames], [filename[1] for filename in filenames], rgbd_images
+    
+    """
+    Returns the rgb filename, depth filename and rgbd image of a frame. Records are read by read_record(frame)
+    if it is given, one at a time otherwise.
+    """
+    def get_rgbd_file(self, dirname, offset, read_record=None):
+        rgb_filename, depth_filename = self._get_filenames(dirname, offset)
+        
+        sequence = self._sequence(dirname)
+        frame = sequence['frame_indices'][offset]
+        if 'rgbd' in sequence:
+            return rgb_filename, depth_filename, sequence['rgbd'][frame]
+        key = self._memory_cache_key(dirname, offset)
+        rgbd_image = self._get_cached_frame(key)
+        if rgbd_image is None:
+            rgbd_image = self._read_rgbd_image(sequence, frame, rgb_filename, depth_filename, read_record)
+            self._put_cached_frame(key, rgbd_image)
+        return rgb_filename, depth_filename, rgbd_image
+    
+    def _read_rgbd_image(self, sequence, frame, rgb_filename, depth_filename, read_record=None):
+        if 'records' in sequence:
+            records = sequence['records']
+            record = read_record(frame) if read_record else records.read(frame)[0]
+            if not records.encoded:
+                return record
+            rgb, depth = record
+            return decode_record(rgb, depth, resize_method=self.resize_method, depth_resize_method=self.depth_resize_method)
+        return read_rgbd_image(rgb_filename, depth_filename, resize_method=self.resize_method,
+                               depth_resize_method=self.depth_resize_method, dtype=np.uint8)
+    
+    """
+    Frames which are neither in the frame cache nor in the records are looked up in the memory cache by
+    sequence and frame number, before they are read or decoded.
+    """
+    def _memory_cache_key(self, dirname, offset):
+        return dirname, int(self._sequence(dirname)['frame_indices'][offset])
     
-    def get_ground_truth(self, dirname, offset):
-        groundtruth = self.seq_dir_map[dirname]['relpos'][offset, :]
-        return groundtruth
+    def _get_cached_frame(self, key):
+        if self.memory_cache is None:
+            return None
+        return self.memory_cache.get(key)
+    
+    def _put_cached_frame(self, key, rgbd_image):
+        if self.memory_cache is not None:
+            self.memory_cache.put(key, rgbd_image)
+    
+    """
+    Returns the twists of the frames at the given offsets relative to the frames stride offsets before them,
+    zero where there is no such frame, composed from the absolute poses in one batch.
+    """
+    def get_ground_truths(self, dirname, offsets, stride=1):
+        sequence = self._sequence(dirname)
+        offsets = np.asarray(offsets)
+        frames = sequence['frame_indices'][offsets]
+        previous_frames = sequence['frame_indices'][np.maximum(offsets - stride, 0)]
+        twists = se3.log(se3.relative(sequence['poses'][previous_frames], sequence['poses'][frames]))
+        twists[offsets < stride] = 0
+        return twists
+    
+    def get_ground_truth(self, dirname, offset, stride=1):
+        return self.get_ground_truths(dirname, [offset], stride)[0]
 
 class PoseNetInputProvider:
     
     BASE_DIR = '/usr/data/cvpr_shared/lingni/cambridge_pose_dataset/KingsCollege/'
     
-    def __init__(self):
-        self.sequence_info = np.loadtxt(os.path.join(self.BASE_DIR, 'dataset_train.txt'), dtype="str", unpack=False)
+    def __init__(self, base_dir=BASE_DIR, cache=None, prefetch_depth=4, prefetch_workers=2):
+        """
+        The images are cropped from a PoseNetCache of the rescaled images, which is built on the first use.
+        
+        cache -- PoseNetCache of the dataset (default: a cache in the dataset directory)
+        prefetch_depth -- number of batches cropped ahead by prefetch_workers threads, 0 disables prefetching
+        """
+        self.base_dir = base_dir
+        dataset_file = os.path.join(base_dir, 'dataset_train.txt')
+        self.filenames, groundtruths = read_stamped_file(dataset_file, key_dtype=str)
+        self.mean = np.array(load_image_stats(base_dir, self.filenames, dataset_file)['mean'], dtype=np.float32)
+        self.cache = cache or PoseNetCache()
+        self.images, self.groundtruths = self.cache.load(base_dir, self.filenames, groundtruths, dataset_file)
+        self.prefetch_depth = prefetch_depth
+        self.prefetch_workers = prefetch_workers
+        self.batch_iterator = None
+        self.batch_rings = {}
         
     class PoseNetBatch:pass
     
     class PoseNetIterator:
         
-        def __init__(self, sequence_info, batch_size):
-            self.sequence_info = sequence_info
-            self.index = 0
+        def __init__(self, input_provider, batch_size, batch_ring, seed, width=224, height=224):
+            self.input_provider = input_provider
             self.batch_size = batch_size
+            self.batch_ring = batch_ring
+            self.seed = seed
+            self.width = width
+            self.height = height
+            # the last batch is left out if it is not complete
+            self.total = (len(input_provider.filenames) - 1) // batch_size
+            self.counter = 0
             self.logger = get_logger()
         
         def __iter__(self):
             return self
         
         def next(self):
-            if self.index + self.batch_size < len(self.sequence_info):
-                batch_info = self.sequence_info[self.index:self.index + self.batch_size]
-                filenames = [os.path.join(PoseNetInputProvider.BASE_DIR, filename) for filename in batch_info[:, 0]]
-                rgb_files = map(read_rgb_image, filenames)
-                mean = get_mean(rgb_files)
-                self.logger.info('Mean for current batch:{}'.format(mean))
-                rgb_files = [rgb_file - mean for rgb_file in rgb_files]
-                groundtruths = batch_info[:, 1:]
-                batch = PoseNetInputProvider.PoseNetBatch()
-                batch.rgb_files = rgb_files
-                batch.groundtruths = groundtruths
-                batch.rgb_filenames = filenames
-                self.index += self.batch_size
+            if self.counter < self.total:
+                batch = self.load_batch(self.counter)
+                self.counter += 1
                 return batch
             else:
                 raise StopIteration()
+        
+        """
+        Returns the batch number counter with random crops of the cached images. The crops are drawn from a
+        generator seeded by the iterator and counter, so that batches can be loaded ahead in any order.
+        """
+        def load_batch(self, counter):
+            input_provider = self.input_provider
+            start = counter * self.batch_size
+            images, groundtruths = self.batch_ring.slot(counter)
+            random_state = np.random.RandomState((self.seed + counter) % 2 ** 32)
+            cached_images = input_provider.images
+            for i in xrange(self.batch_size):
+                width_start = random_state.randint(0, cached_images.shape[2] - self.width)
+                height_start = random_state.randint(0, cached_images.shape[1] - self.height)
+                images[i] = cached_images[start + i, height_start:height_start + self.height, width_start:width_start + self.width]
+            images -= input_provider.mean
+            groundtruths[...] = input_provider.groundtruths[start:start + self.batch_size]
+            batch = PoseNetInputProvider.PoseNetBatch()
+            batch.rgb_files = images
+            batch.groundtruths = groundtruths
+            batch.rgb_filenames = [os.path.join(input_provider.base_dir, filename) for filename in input_provider.filenames[start:start + self.batch_size]]
+            return batch
     
     def sequence_batch_itr(self, batch_size):
-        return PoseNetInputProvider.PoseNetIterator(self.sequence_info, batch_size)
+        """
+        Returns an iterator over the batches of the dataset in order, cropped by a pool of prefetching
+        threads if prefetching is enabled. The batches are written into a BatchRing which is reused by the
+        next iterator, the previous iterator is closed.
+        """
+        if hasattr(self.batch_iterator, 'close'):
+            self.batch_iterator.close()
+        slots = self.prefetch_depth + 2
+        if (slots, batch_size) not in self.batch_rings:
+            self.batch_rings[(slots, batch_size)] = BatchRing(slots, batch_size, (224, 224, 3), self.groundtruths.shape[1])
+        input_batch = PoseNetInputProvider.PoseNetIterator(self, batch_size, self.batch_rings[(slots, batch_size)],
+                                                           np.random.randint(2 ** 31))
+        if self.prefetch_depth > 0:
+            self.batch_iterator = PrefetchIterator(input_batch.load_batch, input_batch.total, self.prefetch_depth, self.prefetch_workers)
+        else:
+            self.batch_iterator = input_batch
+        return self.batch_iterator
 
-def read_rgb_image(filepath):
-    rgb_img = ndimage.imread(filepath)
+def read_rgb_image(filepath, resize_method='skimage', jpeg_draft=False):
     width = height = 224
-    img_width = rgb_img.shape[1]
-    img_height = rgb_img.shape[0]
-
     # scale such that smaller dimension is 256
-    if img_width < img_height:
-        factor = 256.0 / img_width
-    else:
-        factor = 256.0 / img_height
-    rgb_img = transform.rescale(rgb_img, factor, preserve_range=True)
+    rgb_img = read_rescaled_rgb_image(filepath, 256, resize_method, np.float64, jpeg_draft)
 
     # crop randomly
     width_start = np.random.randint(0, rgb_img.shape[1] - width)
@@ -514,23 +753,53 @@ def read_rgb_image(filepath):
     rgb_img = rgb_img[height_start:height_start + height, width_start:width_start + width]
     return rgb_img
 
-def get_mean(rgb_images, channels=3):
-    sum = np.zeros(channels)
-    for rgb_image in rgb_images:
-        sum += np.mean(np.mean(rgb_image, axis=0), axis=0)
-    mean = sum / len(rgb_images)
-    return mean
+queued_input_provider = None
 
-queued_input_provider = QueuedInputProvider()
 def get_queued_input_provider():
+    """
+    Returns the queued input provider, creating it on the first call.
+    """
+    global queued_input_provider
+    if queued_input_provider is None:
+        queued_input_provider = QueuedInputProvider()
     return queued_input_provider
 
+def training_channel_stats():
+    """
+    Returns the channel statistics of the training sequences of the model config, as computed offline by
+    slam.preprocess.channel_stats.
+    """
+    config_provider = get_config_provider()
+    return read_sequence_stats([os.path.join(SimpleInputProvider.BASE_DATA_DIR, filename)
+                                for filename in config_provider.training_filenames()])
+
 def get_simple_input_provider(filename_provider):
-    return SimpleInputProvider(filename_provider)
+    config_provider = get_config_provider()
+    resize_method = config_provider.resize_method()
+    depth_resize_method = config_provider.depth_resize_method()
+    decode_pool = None
+    if config_provider.decode_processes() > 0:
+        decode_pool = DecodePool(config_provider.decode_processes(), buffers=config_provider.prefetch_workers() + 2,
+                                 resize_method=resize_method, depth_resize_method=depth_resize_method)
+    frame_cache = None
+    if config_provider.frame_cache():
+        frame_cache = FrameCache(config_provider.cache_dir(), decode_pool=decode_pool, resize_method=resize_method,
+                                 depth_resize_method=depth_resize_method)
+    memory_cache = None
+    if config_provider.memory_cache_mb() > 0:
+        memory_cache = MemoryFrameCache(config_provider.memory_cache_mb() * 1024 * 1024)
+    frame_records = None
+    if config_provider.frame_records():
+        frame_records = FrameRecords(config_provider.records_dir(), config_provider.records_encoded(), resize_method=resize_method,
+                                     depth_resize_method=depth_resize_method)
+    return SimpleInputProvider(filename_provider, training_channel_stats(), frame_cache, config_provider.prefetch_depth(),
+                               config_provider.prefetch_workers(), decode_pool, resize_method, depth_resize_method, config_provider.standardize(), frame_records,
+                               config_provider.keyframe_overlap(), memory_cache, config_provider.parallel_lanes(), config_provider.strides(),
+                               config_provider.packed_batches())
 
 if __name__ == '__main__':
 #     config_provider = get_config_provider()
-#     input_batch = SimpleInputProvider(config_provider.training_filenames).sequence_batch_itr(10, 1)
+#     input_batch = SimpleInputProvider(config_provider.training_filenames, training_channel_stats()).sequence_batch_itr(10, 1)
     input_batch = PoseNetInputProvider().sequence_batch_itr(10)
     for i, batch in enumerate(input_batch):
         print i, 'rgb files: ', batch.rgb_filenames
@@ -0,0 +1,106 @@
+"""
+Build-once cache of the rescaled images of a PoseNet dataset. The images are decoded and scaled such that
+their shorter side has 256 pixels once, by a pool of processes, JPEG images from a reduced size decoded by
+the JPEG decoder. They are stored as a single uint8 .npy array of shape [n, height, width, 3] together with
+the poses as float32 labels of shape [n, 7]. The arrays are memory-mapped, so that a random crop is a slice
+of the cache instead of the decode and rescale of a full resolution image.
+
+The images of a dataset are expected to have the same size; images which are rescaled to another size are
+resized to the size of the first one. The cache files are named after the dataset file and a key computed
+from the preprocessing parameters, and rebuilt when the dataset file is newer.
+"""
+
+from multiprocessing import Pool
+import os
+
+import numpy as np
+from slam.network.image_processing import read_rescaled_rgb_image
+from slam.network.image_resize import resize
+from slam.utils.file_utils import atomic_save, is_up_to_date, parameter_key
+from slam.utils.logging_utils import get_logger
+from slam.utils.time_utils import time_it
+
+
+CACHE_DIRNAME = 'cache'
+
+# increase when the preprocessing changes without a change of its parameters
+CACHE_VERSION = 1
+
+
+def _read_rescaled_images(args):
+    filepaths, short_side, resize_method, jpeg_draft, shape = args
+    images = np.zeros((len(filepaths),) + tuple(shape), dtype=np.uint8)
+    for i, filepath in enumerate(filepaths):
+        image = read_rescaled_rgb_image(filepath, short_side, resize_method, jpeg_draft=jpeg_draft)
+        if image.shape != images.shape[1:]:
+            image = np.clip(np.rint(resize(image, shape[0], shape[1], 'bilinear')), 0, 255)
+        images[i] = image
+    return images
+
+
+class PoseNetCache:
+
+    def __init__(self, cache_dir=None, short_side=256, resize_method='skimage', processes=None, chunk_size=16, jpeg_draft=True):
+        """
+        cache_dir -- directory of the cache files, by default a 'cache' directory in the dataset directory
+        processes -- number of processes decoding the images when the cache is built (default: number of cpus)
+        jpeg_draft -- decode JPEG images at a reduced size, see read_rescaled_rgb_image
+        """
+        self.cache_dir = cache_dir
+        self.short_side = short_side
+        self.resize_method = resize_method
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.jpeg_draft = jpeg_draft
+        self.logger = get_logger()
+
+    def parameters(self):
+        return {'version': CACHE_VERSION, 'short_side': self.short_side, 'resize': self.resize_method, 'jpeg_draft': self.jpeg_draft}
+
+    def key(self):
+        return parameter_key(self.parameters())
+
+    def _cache_files(self, base_dir, dataset_file):
+        directory = self.cache_dir or os.path.join(base_dir, CACHE_DIRNAME)
+        name = os.path.splitext(os.path.basename(dataset_file))[0]
+        return (os.path.join(directory, '{}_rgb_{}.npy'.format(name, self.key())),
+                os.path.join(directory, '{}_poses_{}.npy'.format(name, self.key())))
+
+    def is_cached(self, base_dir, dataset_file):
+        images_file, labels_file = self._cache_files(base_dir, dataset_file)
+        return is_up_to_date(images_file, [dataset_file]) and is_up_to_date(labels_file, [dataset_file])
+
+    def load(self, base_dir, filenames, groundtruths, dataset_file):
+        """
+        Returns the memory-mapped rescaled images of shape [n, height, width, 3] and the float32 labels of
+        shape [n, 7] of the images listed in dataset_file, building the cache if necessary.
+        """
+        if not self.is_cached(base_dir, dataset_file):
+            self.build(base_dir, filenames, groundtruths, dataset_file)
+        images_file, labels_file = self._cache_files(base_dir, dataset_file)
+        return np.load(images_file, mmap_mode='r'), np.load(labels_file, mmap_mode='r')
+
+    @time_it
+    def build(self, base_dir, filenames, groundtruths, dataset_file):
+        images_file, labels_file = self._cache_files(base_dir, dataset_file)
+        if not os.path.exists(os.path.dirname(images_file)):
+            os.makedirs(os.path.dirname(images_file))
+        filepaths = [os.path.join(base_dir, filename) for filename in filenames]
+        shape = read_rescaled_rgb_image(filepaths[0], self.short_side, self.resize_method, jpeg_draft=self.jpeg_draft).shape
+        self.logger.info('Building PoseNet cache of {} images of shape {} at:{}'.format(len(filepaths), shape, images_file))
+
+        chunks = [filepaths[start:start + self.chunk_size] for start in xrange(0, len(filepaths), self.chunk_size)]
+        with atomic_save(images_file) as tmp_file:
+            images = np.lib.format.open_memmap(tmp_file, mode='w+', dtype=np.uint8, shape=(len(filepaths),) + shape)
+            pool = Pool(self.processes)
+            try:
+                for i, chunk in enumerate(pool.imap(_read_rescaled_images, [(chunk, self.short_side, self.resize_method, self.jpeg_draft, shape)
+                                                                            for chunk in chunks])):
+                    images[i * self.chunk_size:i * self.chunk_size + len(chunk)] = chunk
+            finally:
+                pool.close()
+                pool.join()
+            images.flush()
+            del images
+            with atomic_save(labels_file) as labels_tmp_file:
+                np.save(labels_tmp_file, np.asarray(groundtruths, dtype=np.float32))
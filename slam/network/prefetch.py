@@ -0,0 +1,107 @@
+"""
+Background prefetching of batches. The batches of an epoch are built by worker threads ahead of the
+training loop, so that disk I/O and decoding overlap with session.run instead of alternating with it.
+The lanes of a batch can be loaded by one worker each, so that they are read in parallel.
+"""
+
+import functools
+import sys
+import threading
+
+
+class PrefetchIterator:
+    """
+    Iterates over load(0), ..., load(total - 1) in order. The items are loaded by a number of worker
+    threads, at most depth items are loaded ahead of the consumer. The workers stop when the iterator
+    is exhausted or closed, exceptions raised by load are re-raised by next().
+    """
+
+    def __init__(self, load, total, depth=4, workers=1):
+        self.load = load
+        self.total = total
+        self.index = 0
+        self.next_task = 0
+        self.results = {}
+        self.closed = False
+        self.condition = threading.Condition()
+        self.slots = threading.Semaphore(max(depth, 1))
+        self.threads = [threading.Thread(target=self._work, name='prefetch-{}'.format(i)) for i in xrange(max(min(workers, total), 1))]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self.index >= self.total:
+            self.close()
+            raise StopIteration()
+        with self.condition:
+            while self.index not in self.results:
+                # waiting with a timeout keeps the main thread responsive to KeyboardInterrupt
+                self.condition.wait(1.0)
+            succeeded, result = self.results.pop(self.index)
+        self.index += 1
+        self.slots.release()
+        if not succeeded:
+            self.close()
+            raise result[0], result[1], result[2]
+        return result
+
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+        for _ in self.threads:
+            self.slots.release()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join()
+
+    def _work(self):
+        while True:
+            self.slots.acquire()
+            with self.condition:
+                if self.closed or self.next_task >= self.total:
+                    return
+                task = self.next_task
+                self.next_task += 1
+            try:
+                result = (True, self.load(task))
+            except Exception:
+                result = (False, sys.exc_info())
+            with self.condition:
+                self.results[task] = result
+                self.condition.notify_all()
+
+
+class LaneIterator:
+    """
+    Iterates over combine(i, [load(0, i), ..., load(lanes - 1, i)]) for i = 0, ..., total - 1. Every lane is
+    loaded in order by its own PrefetchIterator with one worker, at most depth items ahead of the consumer.
+    An item is combined when all lanes have loaded it, so that its latency is the one of the slowest lane
+    instead of the sum over the lanes.
+    """
+
+    def __init__(self, load, combine, lanes, total, depth=1):
+        self.combine = combine
+        self.index = 0
+        self.lanes = [PrefetchIterator(functools.partial(load, lane), total, depth, 1) for lane in xrange(lanes)]
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        try:
+            items = [lane.next() for lane in self.lanes]
+        except BaseException:
+            self.close()
+            raise
+        self.index += 1
+        return self.combine(self.index - 1, items)
+
+    def close(self):
+        for lane in self.lanes:
+            lane.close()
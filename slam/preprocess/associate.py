@@ -42,7 +42,13 @@ For this purpose, you can use the ''associate.py'' script. It reads the time sta
 
 import argparse
 from cStringIO import StringIO
+from multiprocessing import Pool
 import os
+import time
+
+import numpy as np
+from slam.preprocess.file_reader import read_stamped_file
+from slam.utils.file_utils import is_up_to_date
 
 
 def read_file_list(filename):
@@ -60,12 +66,8 @@ def read_file_list(filename):
     dict -- dictionary of (stamp,data) tuples
     
     """
-    file = open(filename)
-    data = file.read()
-    lines = data.replace(",", " ").replace("\t", " ").split("\n") 
-    list = [[v.strip() for v in line.split(" ") if v.strip() != ""] for line in lines if len(line) > 0 and line[0] != "#"]
-    list = [(float(l[0]), l[1:]) for l in list if len(l) > 1]
-    return dict(list)
+    stamps, data = read_stamped_file(filename, str)
+    return dict(zip(stamps.tolist(), data.tolist()))
 
 def associate(first_list, second_list, offset, max_difference):
     """
@@ -84,20 +86,148 @@ def associate(first_list, second_list, offset, max_difference):
     """
     first_keys = first_list.keys()
     second_keys = second_list.keys()
-    potential_matches = [(abs(a - (b + offset)), a, b) 
-                         for a in first_keys 
-                         for b in second_keys 
-                         if abs(a - (b + offset)) < max_difference]
-    potential_matches.sort()
+    first_indices, second_indices = associate_indices(first_keys, second_keys, offset, max_difference)
+    matches = [(first_keys[i], second_keys[j]) for i, j in zip(first_indices, second_indices)]
+    return matches
+
+def associate_indices(first_stamps, second_stamps, offset, max_difference):
+    """
+    Associate two arrays of time stamps with the same greedy closest-match rule as associate(): 
+    candidate pairs are accepted in order of increasing time difference as long as neither stamp 
+    has been matched before. Candidates are generated with a binary search on the sorted stamps 
+    instead of comparing every pair, so the cost is O((N+M) log N) instead of O(N*M).
+    
+    Input:
+    first_stamps -- array of time stamps of the first list
+    second_stamps -- array of time stamps of the second list
+    offset -- time offset between both lists (e.g., to model the delay between the sensors)
+    max_difference -- search radius for candidate generation
+
+    Output:
+    first_indices -- indices into first_stamps of the matched pairs, sorted by first stamp
+    second_indices -- indices into second_stamps of the matched pairs
+    
+    """
+    first_stamps = np.asarray(first_stamps, dtype=np.float64)
+    second_stamps = np.asarray(second_stamps, dtype=np.float64)
+    first_order = np.argsort(first_stamps, kind='mergesort')
+    second_order = np.argsort(second_stamps, kind='mergesort')
+    first_sorted = first_stamps[first_order]
+    second_sorted = second_stamps[second_order]
+    second_shifted = second_sorted + offset
+    
+    # candidate window in the second list for every first stamp; it is searched with twice the radius 
+    # so that rounding at the window border cannot drop a candidate, the exact test is done below
+    lower = np.searchsorted(second_shifted, first_sorted - 2 * max_difference, side='left')
+    upper = np.searchsorted(second_shifted, first_sorted + 2 * max_difference, side='right')
+    counts = upper - lower
+    candidate_first = np.repeat(np.arange(len(first_sorted)), counts)
+    candidate_second = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - lower, counts)
+    
+    diffs = np.abs(first_sorted[candidate_first] - second_shifted[candidate_second])
+    valid = diffs < max_difference
+    candidate_first = candidate_first[valid]
+    candidate_second = candidate_second[valid]
+    
+    # same order as sorting the (diff, a, b) tuples
+    order = np.lexsort((second_sorted[candidate_second], first_sorted[candidate_first], diffs[valid]))
+    first_used = [False] * len(first_sorted)
+    second_used = [False] * len(second_sorted)
     matches = []
-    for diff, a, b in potential_matches:
-        if a in first_keys and b in second_keys:
-            first_keys.remove(a)
-            second_keys.remove(b)
+    for a, b in zip(candidate_first[order].tolist(), candidate_second[order].tolist()):
+        if not first_used[a] and not second_used[b]:
+            first_used[a] = True
+            second_used[b] = True
             matches.append((a, b))
     
     matches.sort()
-    return matches
+    matches = np.array(matches, dtype=np.int64).reshape((-1, 2))
+    return first_order[matches[:, 0]], second_order[matches[:, 1]]
+
+class StreamingAssociator:
+    """
+    Incremental version of associate() for capture logs which are still being written. Time stamps of
+    both lists are added as they arrive (in increasing order per list) and a match is emitted once both 
+    lists have advanced window (default: 4 * max_difference) past it. Stamps which are left unmatched at
+    that point are dropped, so memory stays bounded by the window.
+
+    The matches equal those of associate() on the complete lists unless a chain of candidates competing
+    for the same stamps spans more than the window, which requires time stamps jittering by about
+    max_difference.
+
+    Every match is a tuple (first_index, first_stamp, second_index, second_stamp), the indices count the
+    stamps added to the respective list.
+    """
+
+    def __init__(self, offset=0.0, max_difference=0.02, window=None):
+        self.offset = offset
+        self.max_difference = max_difference
+        self.window = window if window is not None else 4 * max_difference
+        self.first_pending = []
+        self.second_pending = []
+        self.first_count = 0
+        self.second_count = 0
+        self.first_latest = None
+        self.second_latest = None
+
+    def add_first(self, stamp):
+        self.first_pending.append((self.first_count, stamp))
+        self.first_count += 1
+        self.first_latest = stamp
+        return self._close()
+
+    def add_second(self, stamp):
+        self.second_pending.append((self.second_count, stamp))
+        self.second_count += 1
+        self.second_latest = stamp
+        return self._close()
+
+    def flush(self):
+        """
+        Associates all pending stamps, to be called when both lists are complete.
+        """
+        return self._close(flush=True)
+
+    def pending(self):
+        return len(self.first_pending), len(self.second_pending)
+
+    def _close(self, flush=False):
+        if flush:
+            horizon = float('inf')
+        elif self.first_latest is None or self.second_latest is None:
+            return []
+        else:
+            horizon = min(self.first_latest, self.second_latest + self.offset) - self.window
+
+        if not self.first_pending or not self.second_pending:
+            self.first_pending = [entry for entry in self.first_pending if entry[1] >= horizon]
+            self.second_pending = [entry for entry in self.second_pending if entry[1] + self.offset >= horizon]
+            return []
+        if self.first_pending[0][1] >= horizon and self.second_pending[0][1] + self.offset >= horizon:
+            return []
+
+        first_stamps = [stamp for _, stamp in self.first_pending]
+        second_stamps = [stamp for _, stamp in self.second_pending]
+        first_indices, second_indices = associate_indices(first_stamps, second_stamps, self.offset, self.max_difference)
+
+        matches = []
+        first_open = set()
+        second_open = set()
+        for i, j in zip(first_indices.tolist(), second_indices.tolist()):
+            first_index, first_stamp = self.first_pending[i]
+            second_index, second_stamp = self.second_pending[j]
+            if first_stamp < horizon and second_stamp + self.offset < horizon:
+                matches.append((first_index, first_stamp, second_index, second_stamp))
+            else:
+                # one of both is still open, the pair is decided on a later call
+                first_open.add(i)
+                second_open.add(j)
+
+        self.first_pending = [entry for i, entry in enumerate(self.first_pending)
+                              if i in first_open or entry[1] >= horizon]
+        self.second_pending = [entry for j, entry in enumerate(self.second_pending)
+                               if j in second_open or entry[1] + self.offset >= horizon]
+        return matches
 
 def get_association(first_file, second_file):
     
@@ -114,21 +244,64 @@ def get_association(first_file, second_file):
     return string_writer.getvalue()
 
 
+def sequence_dirs(base_dir, is_sequence=os.path.isdir):
+    """
+    Returns the sorted directories under base_dir for which is_sequence is true.
+    """
+    seq_dirs = [os.path.join(base_dir, filename) for filename in sorted(os.listdir(base_dir))]
+    return [seq_dir for seq_dir in seq_dirs if is_sequence(seq_dir)]
+
+def _call_star(args):
+    function, seq_dir, function_args = args
+    return seq_dir, function(seq_dir, *function_args)
+
+def map_sequences(function, seq_dirs, args=(), processes=None):
+    """
+    Calls function(seq_dir, *args) for every sequence with a pool of processes, or in this process if
+    processes is 1, and returns the list of (seq_dir, result) pairs. function has to be defined at module
+    level, so that it can be passed to the pool.
+    """
+    tasks = [(function, seq_dir, args) for seq_dir in seq_dirs]
+    if processes == 1:
+        return map(_call_star, tasks)
+    pool = Pool(processes)
+    try:
+        return pool.map(_call_star, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+def _associate_sequence(seq_dir, force=False):
+    rgb_file = os.path.join(seq_dir, 'rgb.txt')
+    depth_file = os.path.join(seq_dir, 'depth.txt')
+    association_file = os.path.join(seq_dir, 'associate.txt')
+    if not (os.path.exists(rgb_file) and os.path.exists(depth_file)):
+        return 'missing'
+    if not force and is_up_to_date(association_file, [rgb_file, depth_file]):
+        return 'skipped'
+    association_data = get_association(rgb_file, depth_file)
+    with open(association_file, 'w') as fw:
+        fw.write(association_data)
+    return 'associated'
+
 """
- Creates association files for data.
+ Creates association files for data. Sequences are associated concurrently by a pool of 
+ processes, sequences whose associate.txt is newer than rgb.txt and depth.txt are skipped
+ unless force is set.
 """
-def create_association_data(base_dir):
+def create_association_data(base_dir, processes=None, force=False):
     logger = get_logger()
-    filenames = [f for f in os.listdir(base_dir)]
-    for filename in filenames:
-        logger.info('Associating data set :{}'.format(filename))
-        rgb_file = os.path.join(base_dir, filename, 'rgb.txt')
-        depth_file = os.path.join(base_dir, filename, 'depth.txt')
-        association_file = os.path.join(base_dir, filename, 'associate.txt')
-        association_data = get_association(rgb_file, depth_file)
-        with open(association_file, 'w') as fw:
-            fw.write(association_data)
-        logger.info('Wrote association data to :{}'.format(association_file))
+    start_time = time.time()
+    seq_dirs = sequence_dirs(base_dir)
+    results = map_sequences(_associate_sequence, seq_dirs, (force,), processes)
+    
+    summary = {}
+    for seq_dir, status in results:
+        logger.debug('Data set :{} {}'.format(seq_dir, status))
+        summary[status] = summary.get(status, 0) + 1
+    logger.info('Association of {} data sets took {:.2f}sec: {} associated, {} up to date, {} missing rgb/depth files'.format(
+                len(seq_dirs), time.time() - start_time, summary.get('associated', 0), summary.get('skipped', 0), summary.get('missing', 0)))
+    return results
     
 
 if __name__ == '__main__':
@@ -143,11 +316,13 @@ if __name__ == '__main__':
     parser.add_argument('--offset', help='time offset added to the timestamps of the second file (default: 0.0)', default=0.0)
     parser.add_argument('--max_difference', help='maximally allowed time difference for matching entries (default: 0.02)', default=0.02)
     parser.add_argument('--base_dir', help='Enter base dir containing slam datasets')
+    parser.add_argument('--processes', help='number of worker processes used with --base_dir (default: number of cpus)', type=int, default=None)
+    parser.add_argument('--force', help='re-associate data sets whose associate.txt is up to date', action='store_true')
     args = parser.parse_args()
 
     base_dir = args.base_dir
     if base_dir:
-        create_association_data(base_dir)
+        create_association_data(base_dir, args.processes, args.force)
     else:
         first_list = read_file_list(args.first_file)
         second_list = read_file_list(args.second_file)
@@ -0,0 +1,166 @@
+"""
+Per-channel mean and standard deviation of the input images, computed once in a parallel pass instead
+of on every batch. The statistics of an rgbd sequence are taken over all frames of its frame table, with
+the depth scaled to [0, 255] like in the input pipeline, and stored as channel_stats.json in the sequence
+directory. Besides mean and std the file holds the count, sum and sum of squares of the pixel values, so
+that the statistics of several sequences can be combined exactly. They are recomputed whenever the frame
+table of the sequence is newer.
+
+The statistics are computed offline by running this module on the data directory; the input providers only
+read them, see read_sequence_stats.
+"""
+
+import argparse
+import json
+from multiprocessing import Pool
+import os
+import time
+
+import numpy as np
+from slam.preprocess.associate import map_sequences, sequence_dirs
+from slam.preprocess.frame_index import FRAME_TABLE_FILENAME, load_frame_table
+from slam.utils.file_utils import atomic_save, is_up_to_date
+from slam.utils.logging_utils import get_logger
+
+
+STATS_FILENAME = 'channel_stats.json'
+
+
+def _accumulate(stats, image):
+    pixels = image.reshape(-1, image.shape[-1]).astype(np.float64)
+    stats['count'] += len(pixels)
+    stats['sum'] += pixels.sum(axis=0)
+    stats['sum_squares'] += np.einsum('ij,ij->j', pixels, pixels)
+
+def _finish(stats):
+    mean = stats['sum'] / max(stats['count'], 1)
+    variance = stats['sum_squares'] / max(stats['count'], 1) - mean ** 2
+    return {'count': stats['count'], 'sum': stats['sum'].tolist(), 'sum_squares': stats['sum_squares'].tolist(),
+            'mean': mean.tolist(), 'std': np.sqrt(np.maximum(variance, 0)).tolist()}
+
+def image_stats(images, channels):
+    """
+    Returns the statistics of an iterable of images of shape [h, w, channels].
+    """
+    stats = {'count': 0, 'sum': np.zeros(channels), 'sum_squares': np.zeros(channels)}
+    for image in images:
+        _accumulate(stats, image)
+    return _finish(stats)
+
+def combine_stats(stats_list):
+    """
+    Combines the statistics of several sequences or image sets.
+    """
+    stats = {'count': sum(stats['count'] for stats in stats_list),
+             'sum': np.sum([stats['sum'] for stats in stats_list], axis=0),
+             'sum_squares': np.sum([stats['sum_squares'] for stats in stats_list], axis=0)}
+    return _finish(stats)
+
+def _read_rgbd_frame(rgb_filename, depth_filename):
+    from scipy import ndimage
+    depth_img = ndimage.imread(depth_filename).astype(np.float64)
+    depth_img *= 255.0 / np.max(depth_img)
+    return np.concatenate((ndimage.imread(rgb_filename), depth_img[:, :, None]), 2)
+
+def compute_sequence_stats(seq_dir):
+    """
+    Computes the rgbd statistics over all frames of the frame table of a sequence.
+    """
+    frame_table = load_frame_table(seq_dir)
+    return image_stats((_read_rgbd_frame(os.path.join(seq_dir, rgb_filename), os.path.join(seq_dir, depth_filename))
+                        for rgb_filename, depth_filename in zip(frame_table.rgb_filenames(), frame_table.depth_filenames())), 4)
+
+def save_stats(filename, stats):
+    with atomic_save(filename) as tmp_file, open(tmp_file, 'w') as f:
+        json.dump(stats, f)
+
+def load_stats(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+def update_sequence_stats(seq_dir, force=False):
+    """
+    Computes and writes the statistics of a sequence if they are missing or older than its frame table.
+    Returns True if they were computed.
+    """
+    stats_file = os.path.join(seq_dir, STATS_FILENAME)
+    if not force and is_up_to_date(stats_file, [os.path.join(seq_dir, FRAME_TABLE_FILENAME)]):
+        return False
+    save_stats(stats_file, compute_sequence_stats(seq_dir))
+    return True
+
+def load_sequence_stats(seq_dirs, processes=None, force=False):
+    """
+    Returns the combined statistics of the given sequences. Missing or outdated statistics of single
+    sequences are computed with a pool of processes first.
+    """
+    seq_dirs = list(seq_dirs)
+    outdated = [seq_dir for seq_dir in seq_dirs
+                if force or not is_up_to_date(os.path.join(seq_dir, STATS_FILENAME), [os.path.join(seq_dir, FRAME_TABLE_FILENAME)])]
+    if outdated:
+        map_sequences(update_sequence_stats, outdated, (force,), processes)
+    return combine_stats([load_stats(os.path.join(seq_dir, STATS_FILENAME)) for seq_dir in seq_dirs])
+
+def read_sequence_stats(seq_dirs):
+    """
+    Returns the combined statistics of the given sequences from their stored statistics, without computing
+    any. Raises an IOError if the statistics of a sequence are missing or older than its frame table.
+    """
+    stats_list = []
+    for seq_dir in seq_dirs:
+        stats_file = os.path.join(seq_dir, STATS_FILENAME)
+        if not is_up_to_date(stats_file, [os.path.join(seq_dir, FRAME_TABLE_FILENAME)]):
+            raise IOError('Channel statistics of {} are missing or outdated, run: python -m slam.preprocess.channel_stats '
+                          '--base_dir {}'.format(seq_dir, os.path.dirname(os.path.normpath(seq_dir))))
+        stats_list.append(load_stats(stats_file))
+    return combine_stats(stats_list)
+
+def _rgb_stats(filenames):
+    from scipy import ndimage
+    return image_stats((ndimage.imread(filename) for filename in filenames), 3)
+
+def load_image_stats(base_dir, filenames, source_file, processes=None, chunk_size=64):
+    """
+    Returns the statistics of a set of rgb images, e.g. of a PoseNet dataset. They are computed in
+    chunks by a pool of processes and stored as channel_stats.json in base_dir, until source_file, the
+    file listing the images, changes.
+    """
+    stats_file = os.path.join(base_dir, STATS_FILENAME)
+    if is_up_to_date(stats_file, [source_file]):
+        return load_stats(stats_file)
+    filepaths = [os.path.join(base_dir, filename) for filename in filenames]
+    pool = Pool(processes)
+    try:
+        stats = pool.map(_rgb_stats, [filepaths[start:start + chunk_size] for start in xrange(0, len(filepaths), chunk_size)])
+    finally:
+        pool.close()
+        pool.join()
+    stats = combine_stats(stats)
+    save_stats(stats_file, stats)
+    return stats
+
+def create_channel_stats(base_dir, processes=None, force=False):
+    """
+    Computes the statistics of all sequences under base_dir and stores their combination in base_dir.
+    """
+    logger = get_logger()
+    start_time = time.time()
+    seq_dirs = sequence_dirs(base_dir, lambda seq_dir: os.path.exists(os.path.join(seq_dir, FRAME_TABLE_FILENAME)))
+
+    stats = load_sequence_stats(seq_dirs, processes, force)
+    save_stats(os.path.join(base_dir, STATS_FILENAME), stats)
+    logger.info('Channel statistics of {} data sets took {:.2f}sec: mean {}, std {}'.format(
+                len(seq_dirs), time.time() - start_time, stats['mean'], stats['std']))
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='''
+    This script computes the per-channel mean and std of all slam datasets with a frame table in a directory
+    ''')
+    parser.add_argument('--base_dir', help='Enter base dir containing slam datasets', required=True)
+    parser.add_argument('--processes', help='number of worker processes (default: number of cpus)', type=int, default=None)
+    parser.add_argument('--force', help='recompute statistics which are up to date', action='store_true')
+    args = parser.parse_args()
+
+    create_channel_stats(args.base_dir, args.processes, args.force)
@@ -0,0 +1,88 @@
+"""
+Columnar reader for the TUM text files (rgb.txt, depth.txt, groundtruth.txt, accelerometer.txt and
+associate.txt). Every line has the format "stamp d1 d2 d3 ..." where the values may be separated by
+spaces, tabs or commas and lines starting with '#' are comments.
+
+Instead of dictionaries or string arrays the files are returned as a float64 array of time stamps and
+a typed array of the remaining columns: float64 for numeric files like groundtruth.txt and an object
+array of interned strings for the filename columns of rgb.txt and depth.txt.
+"""
+
+import itertools
+
+import numpy as np
+
+
+def _convert(values, dtype):
+    if dtype is str:
+        return np.array([[intern(value) for value in row] for row in values], dtype=object)
+    return np.array(values, dtype=dtype)
+
+def _parse_lines(lines, dtype, key_dtype, filename):
+    rows = [line.replace(',', ' ').replace('\t', ' ').split() for line in lines if len(line) > 0 and line[0] != '#']
+    rows = [row for row in rows if len(row) > 1]
+    if not rows:
+        return _convert([], key_dtype).reshape(0), _convert([], dtype).reshape((0, 0))
+
+    columns = len(rows[0])
+    if any(len(row) != columns for row in rows):
+        raise ValueError('Inconsistent number of columns in file:{}'.format(filename))
+
+    keys = _convert([[row[0]] for row in rows], key_dtype)[:, 0]
+    values = _convert([row[1:] for row in rows], dtype)
+    return keys, values
+
+def iter_stamped_file(filename, dtype=np.float64, chunk_size=65536, key_dtype=np.float64):
+    """
+    Reads the file in chunks of chunk_size lines so that very large files never have to be held
+    in memory as text.
+
+    Input:
+    filename -- File name
+    dtype -- type of the data columns, str gives an object array of interned strings
+    chunk_size -- number of lines parsed at once
+    key_dtype -- type of the first column
+
+    Output:
+    generator of (stamps, data) tuples, stamps of shape [n] and data of shape [n, columns - 1]
+    """
+    with open(filename) as f:
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                break
+            stamps, data = _parse_lines(lines, dtype, key_dtype, filename)
+            if len(stamps) > 0:
+                yield stamps, data
+
+def read_stamped_file(filename, dtype=np.float64, chunk_size=None, key_dtype=np.float64):
+    """
+    Reads a complete file, see iter_stamped_file(). Without chunk_size the whole file is parsed at once.
+
+    Output:
+    stamps -- array of shape [n] with the first column
+    data -- array of shape [n, columns - 1] with the remaining columns
+    """
+    if chunk_size is None:
+        with open(filename) as f:
+            return _parse_lines(f.readlines(), dtype, key_dtype, filename)
+
+    chunks = list(iter_stamped_file(filename, dtype, chunk_size, key_dtype))
+    if not chunks:
+        return _convert([], key_dtype).reshape(0), _convert([], dtype).reshape((0, 0))
+    return np.concatenate([chunk[0] for chunk in chunks]), np.concatenate([chunk[1] for chunk in chunks])
+
+def read_association_file(filename, chunk_size=None):
+    """
+    Reads an association file with lines "stamp1 file1 stamp2 file2" as written by associate.py.
+
+    Output:
+    stamps -- float64 array of shape [n, 2]
+    filenames -- object array of shape [n, 2] with interned filenames
+    """
+    first_stamps, data = read_stamped_file(filename, str, chunk_size)
+    if len(first_stamps) == 0:
+        return np.zeros((0, 2)), np.zeros((0, 2), dtype=object)
+    stamps = np.column_stack((first_stamps, data[:, 1].astype(np.float64)))
+    filenames = data[:, [0, 2]]
+    return stamps, filenames
@@ -0,0 +1,282 @@
+"""
+Builds the frame table of a sequence in a single vectorized pass: rgb and depth images are associated
+with the greedy closest-match rule of associate.py, every associated frame is joined with the closest
+groundtruth pose (and optionally the closest accelerometer reading) within a tolerance and frames
+without groundtruth are dropped.
+
+The table is stored as a flat binary file of FRAME_DTYPE records (frames.bin) next to the sequence so
+that the input providers can memory-map it instead of re-deriving the association on every start. It
+is rebuilt whenever one of the source files is newer, except while a StreamingFrameTable writes it.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+from slam.preprocess.associate import associate_indices, map_sequences, sequence_dirs, StreamingAssociator
+from slam.preprocess.file_reader import read_stamped_file
+from slam.utils.file_utils import atomic_save, is_up_to_date
+from slam.utils.logging_utils import get_logger
+
+
+FRAME_TABLE_FILENAME = 'frames.bin'
+
+# present while a StreamingFrameTable appends to the frame table of a sequence
+STREAMING_FILENAME = 'frames.streaming'
+
+FRAME_DTYPE = np.dtype([('rgb_stamp', '<f8'),
+                        ('depth_stamp', '<f8'),
+                        ('rgb_index', '<i4'),
+                        ('depth_index', '<i4'),
+                        ('groundtruth_index', '<i4'),
+                        ('accelerometer_index', '<i4')])
+
+# maximally allowed time differences for matching entries
+MAX_DIFFERENCE = 0.02
+GROUNDTRUTH_DIFFERENCE = 0.02
+ACCELEROMETER_DIFFERENCE = 0.02
+
+
+def _source_files(seq_dir):
+    return [os.path.join(seq_dir, filename) for filename in ['rgb.txt', 'depth.txt', 'groundtruth.txt', 'accelerometer.txt']]
+
+def is_streaming(seq_dir):
+    return os.path.exists(os.path.join(seq_dir, STREAMING_FILENAME))
+
+def nearest_indices(stamps, reference_stamps, max_difference):
+    """
+    Returns for every stamp the index of the closest reference stamp, or -1 if the closest
+    one is max_difference or more away.
+    """
+    stamps = np.asarray(stamps, dtype=np.float64)
+    if len(reference_stamps) == 0:
+        return np.full(len(stamps), -1, dtype=np.int64)
+    order = np.argsort(reference_stamps, kind='mergesort')
+    reference_sorted = np.asarray(reference_stamps, dtype=np.float64)[order]
+
+    right = np.searchsorted(reference_sorted, stamps).clip(0, len(reference_sorted) - 1)
+    left = (right - 1).clip(0, len(reference_sorted) - 1)
+    left_closer = np.abs(stamps - reference_sorted[left]) <= np.abs(reference_sorted[right] - stamps)
+    nearest = np.where(left_closer, left, right)
+
+    indices = order[nearest]
+    indices[np.abs(reference_sorted[nearest] - stamps) >= max_difference] = -1
+    return indices
+
+def build_frame_table(seq_dir, max_difference=MAX_DIFFERENCE, groundtruth_difference=GROUNDTRUTH_DIFFERENCE,
+                      accelerometer_difference=ACCELEROMETER_DIFFERENCE):
+    """
+    Joins rgb.txt, depth.txt, groundtruth.txt and, if present, accelerometer.txt of a sequence.
+
+    Output:
+    frames -- array of FRAME_DTYPE records ordered by rgb stamp, indices refer to the rows of
+              the respective text files; accelerometer_index is -1 where no reading matched
+    """
+    rgb_stamps, _ = read_stamped_file(os.path.join(seq_dir, 'rgb.txt'), str)
+    depth_stamps, _ = read_stamped_file(os.path.join(seq_dir, 'depth.txt'), str)
+    groundtruth_stamps, _ = read_stamped_file(os.path.join(seq_dir, 'groundtruth.txt'))
+
+    rgb_indices, depth_indices = associate_indices(rgb_stamps, depth_stamps, 0.0, max_difference)
+    groundtruth_indices = nearest_indices(rgb_stamps[rgb_indices], groundtruth_stamps, groundtruth_difference)
+
+    accelerometer_file = os.path.join(seq_dir, 'accelerometer.txt')
+    if os.path.exists(accelerometer_file):
+        accelerometer_stamps, _ = read_stamped_file(accelerometer_file)
+        accelerometer_indices = nearest_indices(rgb_stamps[rgb_indices], accelerometer_stamps, accelerometer_difference)
+    else:
+        accelerometer_indices = np.full(len(rgb_indices), -1, dtype=np.int64)
+
+    valid = groundtruth_indices >= 0
+    frames = np.zeros(np.count_nonzero(valid), dtype=FRAME_DTYPE)
+    frames['rgb_stamp'] = rgb_stamps[rgb_indices[valid]]
+    frames['depth_stamp'] = depth_stamps[depth_indices[valid]]
+    frames['rgb_index'] = rgb_indices[valid]
+    frames['depth_index'] = depth_indices[valid]
+    frames['groundtruth_index'] = groundtruth_indices[valid]
+    frames['accelerometer_index'] = accelerometer_indices[valid]
+    return frames
+
+def write_frame_table(seq_dir, frames):
+    with atomic_save(os.path.join(seq_dir, FRAME_TABLE_FILENAME)) as tmp_file:
+        frames.astype(FRAME_DTYPE).tofile(tmp_file)
+
+def read_frame_table(seq_dir):
+    """
+    Memory-maps the frame table of a sequence.
+    """
+    table_file = os.path.join(seq_dir, FRAME_TABLE_FILENAME)
+    if os.path.getsize(table_file) == 0:
+        return np.zeros(0, dtype=FRAME_DTYPE)
+    return np.memmap(table_file, dtype=FRAME_DTYPE, mode='r')
+
+def update_frame_table(seq_dir, force=False):
+    """
+    Builds and writes the frame table of a sequence if it is missing or older than its source files.
+    A table which a StreamingFrameTable is writing is left alone, its source files are newer while the
+    sequence is being recorded. Returns True if the table was rebuilt.
+    """
+    table_file = os.path.join(seq_dir, FRAME_TABLE_FILENAME)
+    if not force and (is_streaming(seq_dir) or is_up_to_date(table_file, _source_files(seq_dir))):
+        return False
+    write_frame_table(seq_dir, build_frame_table(seq_dir))
+    return True
+
+
+class FrameTable:
+    """
+    Frame table of a sequence together with the filename columns of rgb.txt/depth.txt and the
+    groundtruth poses the table refers to.
+    """
+
+    def __init__(self, seq_dir, update=True):
+        if update:
+            update_frame_table(seq_dir)
+        self.seq_dir = seq_dir
+        self.refresh()
+
+    def refresh(self):
+        """
+        Maps the table again, e.g. after a StreamingFrameTable appended frames to it.
+        """
+        self.frames = read_frame_table(self.seq_dir)
+        _, self.rgb_files = read_stamped_file(os.path.join(self.seq_dir, 'rgb.txt'), str)
+        _, self.depth_files = read_stamped_file(os.path.join(self.seq_dir, 'depth.txt'), str)
+        self.groundtruth_stamps, self.groundtruth = read_stamped_file(os.path.join(self.seq_dir, 'groundtruth.txt'))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def rgb_filenames(self):
+        return self.rgb_files[self.frames['rgb_index'], 0]
+
+    def depth_filenames(self):
+        return self.depth_files[self.frames['depth_index'], 0]
+
+    def rgb_filename(self, offset):
+        return self.rgb_files[self.frames['rgb_index'][offset], 0]
+
+    def depth_filename(self, offset):
+        return self.depth_files[self.frames['depth_index'][offset], 0]
+
+    def groundtruth_poses(self):
+        """
+        Returns the groundtruth poses [tx ty tz qx qy qz qw] of all frames as an array of shape [n, 7].
+        """
+        return self.groundtruth[self.frames['groundtruth_index']]
+
+
+class StreamingFrameTable:
+    """
+    Writes the frame table of a sequence which is still being recorded. Stamps are added in the order
+    of their rows in rgb.txt, depth.txt and groundtruth.txt; associated frames are appended to the table
+    as soon as the groundtruth window around them has closed, so that readers can pick them up with
+    FrameTable.refresh() without associating the whole sequence again. Accelerometer readings are not
+    joined and accelerometer_index is -1. Until close() the sequence is marked as streaming, so that
+    update_frame_table does not replace the table.
+    """
+
+    def __init__(self, seq_dir, max_difference=MAX_DIFFERENCE, groundtruth_difference=GROUNDTRUTH_DIFFERENCE):
+        self.table_file = os.path.join(seq_dir, FRAME_TABLE_FILENAME)
+        self.streaming_file = os.path.join(seq_dir, STREAMING_FILENAME)
+        self.associator = StreamingAssociator(0.0, max_difference)
+        self.groundtruth_difference = groundtruth_difference
+        # groundtruth stamps which can still match a pending frame, the first one has row groundtruth_offset
+        self.groundtruth_stamps = []
+        self.groundtruth_offset = 0
+        self.pending_frames = []
+        open(self.streaming_file, 'w').close()
+        open(self.table_file, 'wb').close()
+
+    def add_rgb(self, stamp):
+        self.pending_frames.extend(self.associator.add_first(stamp))
+        return self._append()
+
+    def add_depth(self, stamp):
+        self.pending_frames.extend(self.associator.add_second(stamp))
+        return self._append()
+
+    def add_groundtruth(self, stamp):
+        self.groundtruth_stamps.append(stamp)
+        return self._append()
+
+    def close(self):
+        self.pending_frames.extend(self.associator.flush())
+        appended = self._append(flush=True)
+        # the complete table is up to date with the source files
+        os.utime(self.table_file, None)
+        os.remove(self.streaming_file)
+        return appended
+
+    def _append(self, flush=False):
+        """
+        Appends the pending frames whose groundtruth window has closed and returns their number.
+        """
+        if not self.pending_frames:
+            return 0
+        self.pending_frames.sort(key=lambda frame: frame[1])
+        if flush:
+            ready = len(self.pending_frames)
+        elif not self.groundtruth_stamps:
+            return 0
+        else:
+            closed = self.groundtruth_stamps[-1] - self.groundtruth_difference
+            ready = len([frame for frame in self.pending_frames if frame[1] <= closed])
+        if ready == 0:
+            return 0
+
+        ready_frames = np.array([frame for frame in self.pending_frames[:ready]], dtype=np.float64)
+        self.pending_frames = self.pending_frames[ready:]
+        groundtruth_indices = nearest_indices(ready_frames[:, 1], self.groundtruth_stamps, self.groundtruth_difference)
+        valid = groundtruth_indices >= 0
+
+        frames = np.zeros(np.count_nonzero(valid), dtype=FRAME_DTYPE)
+        frames['rgb_stamp'] = ready_frames[valid, 1]
+        frames['depth_stamp'] = ready_frames[valid, 3]
+        frames['rgb_index'] = ready_frames[valid, 0]
+        frames['depth_index'] = ready_frames[valid, 2]
+        frames['groundtruth_index'] = groundtruth_indices[valid] + self.groundtruth_offset
+        frames['accelerometer_index'] = -1
+        with open(self.table_file, 'ab') as f:
+            frames.tofile(f)
+
+        # groundtruth older than the window of the oldest pending frame cannot match any more
+        if self.pending_frames:
+            oldest = self.pending_frames[0][1] - self.groundtruth_difference
+        else:
+            oldest = ready_frames[-1, 1]
+        stale = np.searchsorted(self.groundtruth_stamps, oldest) - 1
+        if stale > 0:
+            self.groundtruth_stamps = self.groundtruth_stamps[stale:]
+            self.groundtruth_offset += stale
+        return len(frames)
+
+
+def load_frame_table(seq_dir, update=True):
+    return FrameTable(seq_dir, update)
+
+def create_frame_tables(base_dir, processes=None, force=False):
+    """
+    Builds the frame tables of all sequences under base_dir with a pool of processes.
+    """
+    logger = get_logger()
+    start_time = time.time()
+    seq_dirs = sequence_dirs(base_dir, lambda seq_dir: all(os.path.exists(source_file) for source_file in _source_files(seq_dir)[:3]))
+    results = map_sequences(update_frame_table, seq_dirs, (force,), processes)
+
+    rebuilt = len([seq_dir for seq_dir, updated in results if updated])
+    logger.info('Frame tables of {} data sets took {:.2f}sec: {} built, {} up to date'.format(
+                len(seq_dirs), time.time() - start_time, rebuilt, len(seq_dirs) - rebuilt))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='''
+    This script builds the frame tables of all slam datasets in a directory
+    ''')
+    parser.add_argument('--base_dir', help='Enter base dir containing slam datasets', required=True)
+    parser.add_argument('--processes', help='number of worker processes (default: number of cpus)', type=int, default=None)
+    parser.add_argument('--force', help='rebuild frame tables which are up to date', action='store_true')
+    args = parser.parse_args()
+
+    create_frame_tables(args.base_dir, args.processes, args.force)
@@ -1,7 +1,8 @@
 import bisect
-import scipy.ndimage
 
 import numpy as np
+from slam.network.image_resize import resize
+from slam.preprocess.file_reader import read_association_file, read_stamped_file
 import tensorflow as tf
 
 
@@ -54,26 +55,23 @@ def _image_preprocessing(image_rgb, image_depth):
     img = np.concatenate((img_rgb, img_depth), axis=2)
 
     # scale down image
-    return scipy.ndimage.zoom(img, (224.0/480, 224.0/640, 1))
+    return resize(img, 224, 224, 'area')
 
 
 def _initialise_dataset(dataset, reader, path):
-    rgbd = np.loadtxt(path+dataset+"/associated_data.txt", dtype="str",  unpack=False)
-    groundtruth = np.loadtxt(path+dataset+"/groundtruth.txt", dtype="str",  unpack=False)
+    stamps, filenames = read_association_file(path+dataset+"/associated_data.txt")
+    groundtruth_stamps, labels = read_stamped_file(path+dataset+"/groundtruth.txt")
 
     # determine the number of files in dataset
-    num_examples = rgbd.shape[0]
-
-    # read out the labels
-    labels = groundtruth[:, 1:]
+    num_examples = stamps.shape[0]
 
     # drop every nth element out of list
     # n = 3
     # rgbd = np.delete(rgbd, np.arange(0, rgbd.size, 3))
 
     # FIFO queue of filenames
-    filename_queue_rgb = tf.train.string_input_producer(path+dataset + "/" + tf.convert_to_tensor(rgbd[:, 1]))
-    filename_queue_depth = tf.train.string_input_producer(path+dataset + "/" + tf.convert_to_tensor(rgbd[:, 3]))
+    filename_queue_rgb = tf.train.string_input_producer(path+dataset + "/" + tf.convert_to_tensor(filenames[:, 0]))
+    filename_queue_depth = tf.train.string_input_producer(path+dataset + "/" + tf.convert_to_tensor(filenames[:, 1]))
 
     key_rgb, value_rgb = reader.read(filename_queue_rgb)
     key_depth, value_depth = reader.read(filename_queue_depth)
@@ -85,7 +83,7 @@ def _initialise_dataset(dataset, reader, path):
     # compute absolute position
     abs_pos = np.zeros((num_examples, 6))
     for i in range(num_examples):
-        abs_pos[i] = _absolute_position(labels[_find_label(groundtruth[:, 0], rgbd[i, 0])].astype(np.float))
+        abs_pos[i] = _absolute_position(labels[_find_label(groundtruth_stamps, stamps[i, 0])])
 
     return image_rgb, image_depth, abs_pos, num_examples
 
@@ -0,0 +1,151 @@
+"""
+Keyframes of the sequences selected by the overlap of their depth images, computed once in a parallel
+pass instead of on every start of the input provider. A frame is a keyframe if less than the overlap
+threshold of the point cloud of the previous keyframe, transformed with the groundtruth poses, falls into
+its image; all other frames are dropped as near duplicates. The depth images of a sequence are read once
+for all thresholds.
+
+The selection is stored as a flat binary file of KEYFRAME_DTYPE records (KEYFRAMES_FILENAME) next to the
+sequence: for every overlap threshold and static drop the index of the keyframe in the frame table and its
+twist relative to the previous keyframe. It is rebuilt whenever the frame table or the groundtruth is
+newer, thresholds which are missing are added to it.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+from slam.preprocess.associate import map_sequences, sequence_dirs
+from slam.preprocess.frame_index import FRAME_TABLE_FILENAME, load_frame_table
+from slam.utils import se3
+from slam.utils.file_utils import atomic_save, is_up_to_date
+from slam.utils.logging_utils import get_logger
+from slam.utils.projection import get_sequence_camera
+
+
+# increase the version when the selection changes
+KEYFRAMES_FILENAME = 'keyframes_v2.bin'
+
+KEYFRAME_DTYPE = np.dtype([('threshold', '<f4'),
+                           ('static_drop', '<i4'),
+                           ('frame', '<i4'),
+                           ('twist', '<f8', (6,))])
+
+# every n-th pixel of the depth images is used to estimate the overlap of frames
+PIXEL_STEP = 4
+
+
+def _source_files(seq_dir):
+    return [os.path.join(seq_dir, FRAME_TABLE_FILENAME), os.path.join(seq_dir, 'groundtruth.txt')]
+
+def select_keyframes(frame_table, thresholds, static_drop=1, pixel_step=PIXEL_STEP):
+    """
+    Selects the keyframes of every overlap threshold among every static_drop-th frame of a frame table.
+    The depth images are back-projected with the camera of the sequence, see get_sequence_camera.
+
+    Output:
+    keyframes -- array of KEYFRAME_DTYPE records ordered by threshold and frame; the first frame is always
+                 a keyframe with a zero twist
+    """
+    from scipy import misc
+    thresholds = np.asarray(thresholds, dtype=np.float32)
+    frames = np.arange(0, len(frame_table), static_drop)
+    if len(frames) == 0:
+        return np.zeros(0, dtype=KEYFRAME_DTYPE)
+    trans = se3.quaternion_to_transformation(frame_table.groundtruth_poses()[frames])
+    depth_filenames = frame_table.depth_filenames()[frames]
+    camera = get_sequence_camera(frame_table.seq_dir)
+
+    # the last keyframe and its point cloud of every threshold
+    selected = [[0] for _ in thresholds]
+    pointclouds = [None] * len(thresholds)
+    for i in xrange(len(frames)):
+        pointcloud = camera.back_project(misc.imread(os.path.join(frame_table.seq_dir, depth_filenames[i])), pixel_step)
+        for j, threshold in enumerate(thresholds):
+            if i > 0:
+                # the old pointcloud transformed into the current frame
+                relative_trans = se3.relative(trans[selected[j][-1]], trans[i])
+                if camera.overlap(pointclouds[j], se3.inverse(relative_trans)) >= threshold:
+                    continue
+                selected[j].append(i)
+            pointclouds[j] = pointcloud
+
+    keyframes = np.zeros(sum(len(indices) for indices in selected), dtype=KEYFRAME_DTYPE)
+    start = 0
+    for threshold, indices in zip(thresholds, selected):
+        end = start + len(indices)
+        keyframes['threshold'][start:end] = threshold
+        keyframes['static_drop'][start:end] = static_drop
+        keyframes['frame'][start:end] = frames[indices]
+        keyframes['twist'][start + 1:end] = se3.log(se3.relative(trans[indices[:-1]], trans[indices[1:]]))
+        start = end
+    return keyframes
+
+def write_keyframe_index(seq_dir, keyframes):
+    with atomic_save(os.path.join(seq_dir, KEYFRAMES_FILENAME)) as tmp_file:
+        keyframes.astype(KEYFRAME_DTYPE).tofile(tmp_file)
+
+def read_keyframe_index(seq_dir):
+    return np.fromfile(os.path.join(seq_dir, KEYFRAMES_FILENAME), dtype=KEYFRAME_DTYPE)
+
+def _is_selected(keyframes, threshold, static_drop):
+    return (keyframes['threshold'] == np.float32(threshold)) & (keyframes['static_drop'] == static_drop)
+
+def update_keyframe_index(seq_dir, thresholds, static_drop=1, force=False):
+    """
+    Selects the keyframes of the thresholds which are missing in the index of a sequence, or of all of
+    them if the index is older than the frame table or the groundtruth. Returns True if it was updated.
+    """
+    keyframes = np.zeros(0, dtype=KEYFRAME_DTYPE)
+    if not force and is_up_to_date(os.path.join(seq_dir, KEYFRAMES_FILENAME), _source_files(seq_dir)):
+        keyframes = read_keyframe_index(seq_dir)
+    missing = [threshold for threshold in thresholds if not np.any(_is_selected(keyframes, threshold, static_drop))]
+    if not missing:
+        return False
+    keyframes = np.concatenate((keyframes, select_keyframes(load_frame_table(seq_dir), missing, static_drop)))
+    write_keyframe_index(seq_dir, keyframes)
+    return True
+
+def load_keyframes(seq_dir, threshold, static_drop=1):
+    """
+    Returns the indices of the keyframes of a sequence in its frame table and their twists relative to the
+    previous keyframe, selecting them first if they are not in the index.
+    """
+    update_keyframe_index(seq_dir, [threshold], static_drop)
+    keyframes = read_keyframe_index(seq_dir)
+    keyframes = keyframes[_is_selected(keyframes, threshold, static_drop)]
+    return keyframes['frame'].astype(np.int64), keyframes['twist']
+
+def create_keyframe_indices(base_dir, thresholds, static_drop=1, processes=None, force=False):
+    """
+    Selects the keyframes of all sequences with a frame table under base_dir with a pool of processes.
+    """
+    logger = get_logger()
+    start_time = time.time()
+    seq_dirs = sequence_dirs(base_dir, lambda seq_dir: os.path.exists(os.path.join(seq_dir, FRAME_TABLE_FILENAME)))
+    results = map_sequences(update_keyframe_index, seq_dirs, (thresholds, static_drop, force), processes)
+
+    updated = len([seq_dir for seq_dir, selected in results if selected])
+    logger.info('Keyframes of {} data sets took {:.2f}sec: {} selected, {} up to date'.format(
+                len(seq_dirs), time.time() - start_time, updated, len(seq_dirs) - updated))
+    for seq_dir in seq_dirs:
+        keyframes = read_keyframe_index(seq_dir)
+        counts = [np.count_nonzero(_is_selected(keyframes, threshold, static_drop)) for threshold in thresholds]
+        logger.info('{}: {} keyframes for the thresholds {}'.format(os.path.basename(seq_dir), counts, thresholds))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='''
+    This script selects the keyframes of all slam datasets with a frame table in a directory
+    ''')
+    parser.add_argument('--base_dir', help='Enter base dir containing slam datasets', required=True)
+    parser.add_argument('--thresholds', help='maximal overlaps of a keyframe with the previous one (default: 0.5 0.7 0.9)',
+                        type=float, nargs='+', default=[0.5, 0.7, 0.9])
+    parser.add_argument('--static_drop', help='select among every n-th frame (default: 1)', type=int, default=1)
+    parser.add_argument('--processes', help='number of worker processes (default: number of cpus)', type=int, default=None)
+    parser.add_argument('--force', help='select keyframes which are up to date again', action='store_true')
+    args = parser.parse_args()
+
+    create_keyframe_indices(args.base_dir, args.thresholds, args.static_drop, args.processes, args.force)
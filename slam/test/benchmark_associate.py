@@ -0,0 +1,60 @@
+import argparse
+import random
+import time
+
+from slam.preprocess.associate import read_file_list, associate
+
+"""
+ Compares the searchsorted based association against the original pairwise implementation.
+ Without input files a synthetic 30Hz rgb/depth capture of the given length is used.
+"""
+
+def associate_pairwise(first_list, second_list, offset, max_difference):
+    first_keys = first_list.keys()
+    second_keys = second_list.keys()
+    potential_matches = [(abs(a - (b + offset)), a, b)
+                         for a in first_keys
+                         for b in second_keys
+                         if abs(a - (b + offset)) < max_difference]
+    potential_matches.sort()
+    matches = []
+    for diff, a, b in potential_matches:
+        if a in first_keys and b in second_keys:
+            first_keys.remove(a)
+            second_keys.remove(b)
+            matches.append((a, b))
+
+    matches.sort()
+    return matches
+
+def synthetic_stamps(frames, rate=30.0, jitter=0.01, drop=0.02):
+    start = 1305031102.175304
+    stamps = [round(start + i / rate + random.uniform(-jitter, jitter), 6) for i in xrange(frames) if random.random() > drop]
+    return dict((stamp, ['%f.png' % stamp]) for stamp in stamps)
+
+def time_call(func, *args):
+    start_time = time.time()
+    result = func(*args)
+    return result, time.time() - start_time
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of rgb/depth time stamp association')
+    parser.add_argument('--first_file', help='rgb.txt of a TUM sequence')
+    parser.add_argument('--second_file', help='depth.txt of a TUM sequence')
+    parser.add_argument('--frames', help='frames of the synthetic sequence (default: 5000)', type=int, default=5000)
+    parser.add_argument('--max_difference', help='maximally allowed time difference (default: 0.02)', type=float, default=0.02)
+    args = parser.parse_args()
+
+    if args.first_file and args.second_file:
+        first_list = read_file_list(args.first_file)
+        second_list = read_file_list(args.second_file)
+    else:
+        first_list = synthetic_stamps(args.frames)
+        second_list = synthetic_stamps(args.frames)
+
+    expected, pairwise_time = time_call(associate_pairwise, first_list, second_list, 0.0, args.max_difference)
+    matches, sorted_time = time_call(associate, first_list, second_list, 0.0, args.max_difference)
+
+    print 'stamps: {} x {}, matches: {}'.format(len(first_list), len(second_list), len(matches))
+    print 'pairwise: {:.3f}sec, searchsorted: {:.3f}sec, speedup: {:.1f}x'.format(pairwise_time, sorted_time, pairwise_time / max(sorted_time, 1e-9))
+    print 'results identical: {}'.format(matches == expected)
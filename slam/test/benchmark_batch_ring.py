@@ -0,0 +1,80 @@
+import argparse
+import time
+
+import numpy as np
+from slam.network.memory_cache import MemoryFrameCache
+from slam.network.model_input import SimpleInputProvider
+from slam.preprocess.channel_stats import load_sequence_stats
+
+"""
+ Measures the batch assembly of the training loop of lstm_rgbd.py for a number of batch sizes: the frames
+ and groundtruths of a step collected in lists, stacked and converted for the feed, like the provider did
+ before, against batches written into the preallocated ring. The frames are served from a warm memory
+ cache, so that decoding does not hide the cost of the assembly. Reports the time per step, with
+ --tensorflow including the feed into a small graph, and the bytes of the arrays a step creates beside the
+ preallocated ring: the arrays it returns which are not views of the ring, and the stacked frames.
+"""
+
+def list_step(input_batch, counter):
+    input_provider = input_batch.input_provider
+    seqdir_vs_frame = [(seq_dirs[counter], offsets[counter]) for seq_dirs, offsets in zip(input_batch.seq_dirs, input_batch.offsets)]
+    _, _, rgbd_files = input_provider.get_rgbd_files(seqdir_vs_frame)
+    groundtruths = [input_provider.get_ground_truth(seqdir, frame) for seqdir, frame in seqdir_vs_frame]
+    rgbd_frames = np.array(rgbd_files)
+    images = np.subtract(rgbd_frames, input_provider.mean, dtype=np.float32)
+    # the conversion of the list of float64 groundtruths for the float32 placeholder
+    labels = np.array(groundtruths, dtype=np.float32)
+    return images, labels, [rgbd_frames]
+
+def ring_step(input_batch, counter):
+    sequence_batch = input_batch.load_batch(counter)
+    return sequence_batch.feed_images(), sequence_batch.groundtruths, []
+
+def _new_bytes(batch_ring, arrays):
+    return sum(array.nbytes for array in arrays
+               if not (np.may_share_memory(array, batch_ring.images) or np.may_share_memory(array, batch_ring.labels)))
+
+def time_steps(step, input_batch, steps, feed):
+    allocated = 0
+    start_time = time.time()
+    for counter in xrange(steps):
+        images, labels, intermediates = step(input_batch, counter)
+        feed(images, labels)
+        allocated += _new_bytes(input_batch.batch_ring, [images, labels] + intermediates)
+    return (time.time() - start_time) * 1000.0 / steps, allocated / float(steps)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the batch assembly of the rgbd input provider')
+    parser.add_argument('--seq_dir', help='directory of a TUM sequence with a frame table', required=True)
+    parser.add_argument('--batch_sizes', help='comma separated batch sizes (default: 1,4,8,16)', default='1,4,8,16')
+    parser.add_argument('--steps', help='number of steps per batch size (default: 50)', type=int, default=50)
+    parser.add_argument('--tensorflow', help='feed the batches into a graph', action='store_true')
+    args = parser.parse_args()
+
+    input_provider = SimpleInputProvider(lambda: [args.seq_dir], load_sequence_stats([args.seq_dir]), resize_method='bilinear', depth_resize_method='bilinear',
+                                         memory_cache=MemoryFrameCache(2 ** 31))
+    frames = len(input_provider._sequence(args.seq_dir)['frame_indices'])
+    # fills the memory cache
+    for offset in xrange(frames):
+        input_provider.get_rgbd_file(args.seq_dir, offset)
+
+    feed = lambda images, labels: None
+    if args.tensorflow:
+        import tensorflow as tf
+        session = tf.Session()
+
+    for batch_size in [int(batch_size) for batch_size in args.batch_sizes.split(',')]:
+        if args.tensorflow:
+            images_placeholder = tf.placeholder(tf.float32, [batch_size, 224, 224, 4])
+            labels_placeholder = tf.placeholder(tf.float32, [batch_size, 6])
+            total = tf.reduce_sum(images_placeholder) + tf.reduce_sum(labels_placeholder)
+            feed = lambda images, labels: session.run(total, feed_dict={images_placeholder: images, labels_placeholder: labels})
+        offsets = [(lane * 7) % frames for lane in xrange(batch_size)]
+        steps = min(args.steps, frames - max(offsets))
+        lanes = [[(args.seq_dir, offset, 1, steps)] for offset in offsets]
+        input_batch = SimpleInputProvider.SequenceBatchIterator(input_provider, lanes, steps)
+
+        list_ms, list_bytes = time_steps(list_step, input_batch, steps, feed)
+        ring_ms, ring_bytes = time_steps(ring_step, input_batch, steps, feed)
+        print 'batch size {:>2}: lists {:7.2f}ms/step {:7.2f}MB/step, ring {:7.2f}ms/step {:7.2f}MB/step, speedup: {:.2f}x'.format(
+            batch_size, list_ms, list_bytes / 2.0 ** 20, ring_ms, ring_bytes / 2.0 ** 20, list_ms / ring_ms)
@@ -0,0 +1,63 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from slam.network.decode_pool import DecodePool
+from slam.network.frame_cache import FrameCache
+from slam.network.image_processing import read_rgbd_image
+from slam.preprocess.frame_index import load_frame_table
+
+"""
+ Compares reading the frames of a sequence by decoding the PNG files, in this process and with
+ decode pools of increasing size, with reading them from the memory-mapped frame cache.
+"""
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the rgbd frame cache')
+    parser.add_argument('--seq_dir', help='directory of a TUM sequence', required=True)
+    parser.add_argument('--cache_dir', help='directory of the cache files (default: inside the sequence)', default=None)
+    parser.add_argument('--frames', help='number of frames read (default: 200)', type=int, default=200)
+    parser.add_argument('--processes', help='comma separated sizes of the decode pools (default: 2,4,8)', default='2,4,8')
+    args = parser.parse_args()
+
+    frame_table = load_frame_table(args.seq_dir)
+    frames = min(args.frames, len(frame_table))
+    rgb_filenames = frame_table.rgb_filenames()
+    depth_filenames = frame_table.depth_filenames()
+    # every path decodes the frames like the cache does
+    frame_cache = FrameCache(args.cache_dir)
+
+    start_time = time.time()
+    for i in xrange(frames):
+        rgbd_image = read_rgbd_image(os.path.join(args.seq_dir, rgb_filenames[i]), os.path.join(args.seq_dir, depth_filenames[i]),
+                                     resize_method=frame_cache.resize_method, depth_resize_method=frame_cache.depth_resize_method,
+                                     dtype=frame_cache.dtype)
+    decode_time = time.time() - start_time
+    print 'decode in process: {:.1f} frames/sec'.format(frames / decode_time)
+
+    filename_pairs = [(os.path.join(args.seq_dir, rgb_filenames[i]), os.path.join(args.seq_dir, depth_filenames[i])) for i in xrange(frames)]
+    for processes in [int(processes) for processes in args.processes.split(',')]:
+        decode_pool = DecodePool(processes, resize_method=frame_cache.resize_method, depth_resize_method=frame_cache.depth_resize_method,
+                                 dtype=frame_cache.dtype)
+        start_time = time.time()
+        for start in xrange(0, frames, decode_pool.batch_size):
+            decode_pool.decode(filename_pairs[start:start + decode_pool.batch_size])
+        pool_time = time.time() - start_time
+        decode_pool.close()
+        print 'decode pool of {} processes: {:.1f} frames/sec, speedup: {:.1f}x'.format(processes, frames / pool_time, decode_time / pool_time)
+
+    start_time = time.time()
+    cached_frames, _ = frame_cache.load(args.seq_dir, np.zeros((len(frame_table), 6)))
+    build_time = time.time() - start_time
+
+    start_time = time.time()
+    for i in xrange(frames):
+        # copied so that the pages are actually read
+        cached_image = np.array(cached_frames[i])
+    cached_time = time.time() - start_time
+
+    print 'frames: {}, cache build: {:.2f}sec for {} frames'.format(frames, build_time, len(frame_table))
+    print 'decode: {:.1f} frames/sec, cache: {:.1f} frames/sec, speedup: {:.1f}x'.format(frames / decode_time, frames / max(cached_time, 1e-9),
+                                                                              decode_time / max(cached_time, 1e-9))
+    print 'cached frames identical: {}'.format(np.array_equal(cached_image, rgbd_image))
@@ -0,0 +1,50 @@
+import argparse
+import os
+import subprocess
+import sys
+
+"""
+ Measures the time of importing the input pipeline modules in a fresh interpreter, as seen by a script or
+ a worker process starting, and lists the heavy packages the import pulled in. The interpreter is started
+ outside of the repository to check that importing does not depend on the working directory.
+"""
+
+MODULES = ['slam.utils.se3',
+           'slam.utils.projection',
+           'slam.preprocess.frame_index',
+           'slam.preprocess.channel_stats',
+           'slam.preprocess.keyframe_index',
+           'slam.network.model_config',
+           'slam.network.image_processing',
+           'slam.network.model_input']
+
+HEAVY_PACKAGES = ['tensorflow', 'scipy', 'skimage']
+
+IMPORT_SCRIPT = '''
+import sys, time
+start_time = time.time()
+import {module}
+milliseconds = (time.time() - start_time) * 1000.0
+print milliseconds, ','.join(package for package in {packages!r} if package in sys.modules)
+'''
+
+def time_import(module, repo_dir):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([repo_dir] + [path for path in [env.get('PYTHONPATH')] if path])
+    output = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT.format(module=module, packages=HEAVY_PACKAGES)],
+                                     env=env, cwd='/')
+    milliseconds, packages = output.strip().split('\n')[-1].partition(' ')[::2]
+    return float(milliseconds), packages
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the import time of the input pipeline modules')
+    parser.add_argument('--repeat', help='number of fresh interpreters per module, the fastest is reported (default: 3)',
+                        type=int, default=3)
+    parser.add_argument('modules', help='modules to import (default: the input pipeline modules)', nargs='*', default=MODULES)
+    args = parser.parse_args()
+
+    repo_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for module in args.modules:
+        results = [time_import(module, repo_dir) for _ in xrange(args.repeat)]
+        milliseconds = min(result[0] for result in results)
+        print '{:>32}: {:9.2f}ms, loaded: {}'.format(module, milliseconds, results[0][1] or '-')
@@ -0,0 +1,73 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from scipy import misc, ndimage
+from slam.network.image_processing import read_rescaled_rgb_image
+from slam.preprocess.file_reader import read_stamped_file
+
+"""
+ Compares the decode of PoseNet images to a 256 pixel short side: ndimage.imread at full resolution and
+ transform.rescale, as read_rgb_image did so far, against read_rescaled_rgb_image with and without the
+ reduced-size JPEG decode for a number of resize backends. Reports the time per frame and the mean and
+ maximal absolute pixel error against the full resolution path. The images of a dataset are used if
+ --base_dir is given, random smooth JPEGs of 1920x1080 like the Cambridge images otherwise.
+"""
+
+def _dataset_images(base_dir, frames):
+    filenames, _ = read_stamped_file(os.path.join(base_dir, 'dataset_train.txt'), key_dtype=str)
+    return [os.path.join(base_dir, filename) for filename in filenames[:frames]]
+
+def _synthetic_images(directory, frames, quality=90):
+    # smooth images, white noise would overstate the error of the reduced decode
+    filepaths = []
+    for i in xrange(frames):
+        rgb = ndimage.gaussian_filter(np.random.rand(1080, 1920, 3), (8, 8, 0))
+        rgb = (255 * (rgb - rgb.min()) / (rgb.max() - rgb.min())).astype(np.uint8)
+        filepaths.append(os.path.join(directory, '{}.jpg'.format(i)))
+        misc.toimage(rgb).save(filepaths[-1], quality=quality)
+    return filepaths
+
+def _imread_rescale(filepath):
+    from skimage import transform
+    rgb_img = ndimage.imread(filepath)
+    return transform.rescale(rgb_img, 256.0 / min(rgb_img.shape[:2]), preserve_range=True)
+
+def _benchmark(read, filepaths):
+    start_time = time.time()
+    images = [read(filepath) for filepath in filepaths]
+    return (time.time() - start_time) * 1000.0 / len(filepaths), images
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the reduced-size JPEG decode of PoseNet images')
+    parser.add_argument('--base_dir', help='directory of a PoseNet dataset with dataset_train.txt (default: synthetic images)',
+                        default=None)
+    parser.add_argument('--frames', help='number of frames decoded (default: 20)', type=int, default=20)
+    parser.add_argument('--methods', help='comma separated resize backends (default: skimage,bilinear,area)',
+                        default='skimage,bilinear,area')
+    args = parser.parse_args()
+
+    directory = None
+    if args.base_dir:
+        filepaths = _dataset_images(args.base_dir, args.frames)
+    else:
+        directory = tempfile.mkdtemp()
+        filepaths = _synthetic_images(directory, args.frames)
+
+    try:
+        reference_ms, reference = _benchmark(_imread_rescale, filepaths)
+        print '{:>24}: {:7.2f}ms/frame, shape {}'.format('imread + rescale', reference_ms, reference[0].shape)
+        for method in args.methods.split(','):
+            for jpeg_draft in [False, True]:
+                read = lambda filepath: read_rescaled_rgb_image(filepath, 256, method, np.float64, jpeg_draft)
+                ms_per_frame, images = _benchmark(read, filepaths)
+                errors = np.abs(np.array(images) - np.array(reference))
+                print '{:>24}: {:7.2f}ms/frame, speedup: {:5.2f}x, error mean {:7.3f} max {:9.3f}'.format(
+                    '{} {}'.format(method, 'draft' if jpeg_draft else 'full'), ms_per_frame, reference_ms / ms_per_frame,
+                    errors.mean(), errors.max())
+    finally:
+        if directory:
+            shutil.rmtree(directory)
@@ -0,0 +1,70 @@
+import argparse
+import time
+
+import numpy as np
+from slam.network.lstm_model import LSTMmodel
+from slam.network.model_config import get_config_provider
+import tensorflow as tf
+
+"""
+ Measures the training throughput of the CNN+LSTM network of lstm_rgbd.py in frames per second for a
+ number of batch sizes, i.e. of sequences trained at once with one lstm state lane each. Every step runs
+ the optimizer on one frame of every lane and feeds the lstm state of the previous step back, like the
+ training loop does. The frames are random, so that the input pipeline does not hide the cost of the
+ graph. With --lstm_only random cnn outputs are fed into the lstm instead of building the cnn.
+"""
+
+def build_training_graph(batch_size, lstm_only):
+    config_provider = get_config_provider()
+    lstm_layers = config_provider.lstm_layers()
+    cnn_output_dim = config_provider.cnn_output_dim()
+    groundtruth_batch = tf.placeholder(tf.float32, [batch_size, 6])
+    lstm_init_state = tf.placeholder(tf.float32, [batch_size, 2 * cnn_output_dim * lstm_layers])
+    if lstm_only:
+        input_batch = tf.placeholder(tf.float32, [batch_size, cnn_output_dim])
+        lstm_model = LSTMmodel(input_batch, layer_size=cnn_output_dim, layers=lstm_layers, output_dim=6,
+                               ground_truth=groundtruth_batch, batch_size=batch_size, init_state=lstm_init_state)
+        lstm_model.build_graph()
+    else:
+        # imported here, as the cnn needs the caffe converter and the converted weights
+        from slam.main.lstm_rgbd import build_complete_network, img_h, img_w
+        input_batch = tf.placeholder(tf.float32, [batch_size, img_h, img_w, 4])
+        lstm_model = build_complete_network(input_batch, groundtruth_batch, lstm_init_state, batch_size, lstm_layers,
+                                            cnn_output_dim, config_provider.normalization_epsilon())[2]
+    loss_mask = tf.placeholder(tf.float32, [batch_size])
+    lstm_model.add_loss(tf.constant(np.identity(6), tf.float32), loss_mask)
+    lstm_model.add_optimizer()
+    return input_batch, groundtruth_batch, lstm_init_state, loss_mask, lstm_model
+
+def time_training(batch_size, steps, lstm_only):
+    with tf.Graph().as_default():
+        input_batch, groundtruth_batch, lstm_init_state, loss_mask, lstm_model = build_training_graph(batch_size, lstm_only)
+        session = tf.Session()
+        session.run(tf.initialize_all_variables())
+        feed_dict = {input_batch: np.random.uniform(-1, 1, input_batch.get_shape().as_list()).astype(np.float32),
+                     groundtruth_batch: np.random.uniform(-1, 1, [batch_size, 6]).astype(np.float32),
+                     loss_mask: np.ones(batch_size, np.float32)}
+        lstm_state = np.zeros(lstm_init_state.get_shape().as_list(), np.float32)
+        # the first step allocates the buffers of the graph
+        for step in xrange(steps + 1):
+            if step == 1:
+                start_time = time.time()
+            feed_dict[lstm_init_state] = lstm_state
+            lstm_state = session.run([lstm_model.apply_gradient_op, lstm_model.final_state], feed_dict=feed_dict)[1]
+        seconds = time.time() - start_time
+        session.close()
+    return seconds * 1000.0 / steps, batch_size * steps / seconds
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the training throughput of the cnn+lstm network by batch size')
+    parser.add_argument('--batch_sizes', help='comma separated batch sizes (default: 1,4,8,16)', default='1,4,8,16')
+    parser.add_argument('--steps', help='number of steps per batch size (default: 10)', type=int, default=10)
+    parser.add_argument('--lstm_only', help='feed random cnn outputs into the lstm', action='store_true')
+    args = parser.parse_args()
+
+    results = []
+    for batch_size in [int(batch_size) for batch_size in args.batch_sizes.split(',')]:
+        step_ms, frames_per_sec = time_training(batch_size, args.steps, args.lstm_only)
+        results.append(frames_per_sec)
+        print 'batch size {:>2}: {:9.2f}ms/step {:9.2f} frames/sec, speedup: {:.2f}x'.format(
+            batch_size, step_ms, frames_per_sec, frames_per_sec / results[0])
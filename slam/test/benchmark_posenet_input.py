@@ -0,0 +1,57 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from slam.network.model_input import PoseNetInputProvider, read_rgb_image
+from slam.network.posenet_cache import PoseNetCache
+
+"""
+ Measures the PoseNet input pipeline of posenet.py and vgg16_posenet.py: the batches decoded, rescaled and
+ cropped one image at a time like the provider did before, against random crops of the cached rescaled
+ images by a number of prefetching threads. The cache is built first, the time of building it is reported
+ separately.
+"""
+
+def decode_batches(input_provider, batch_size, batches):
+    for counter in xrange(batches):
+        filenames = [os.path.join(input_provider.base_dir, filename)
+                     for filename in input_provider.filenames[counter * batch_size:(counter + 1) * batch_size]]
+        rgb_files = np.array(map(read_rgb_image, filenames), dtype=np.float32) - input_provider.mean
+        groundtruths = np.array(input_provider.groundtruths[counter * batch_size:(counter + 1) * batch_size])
+    return rgb_files, groundtruths
+
+def cached_batches(input_provider, batch_size, batches):
+    for counter, batch in enumerate(input_provider.sequence_batch_itr(batch_size)):
+        if counter + 1 == batches:
+            input_provider.batch_iterator.close()
+            break
+    return batch.rgb_files, batch.groundtruths
+
+def time_batches(load, input_provider, batch_size, batches):
+    start_time = time.time()
+    load(input_provider, batch_size, batches)
+    return (time.time() - start_time) * 1000.0 / batches
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the PoseNet input provider')
+    parser.add_argument('--base_dir', help='directory of a PoseNet dataset with dataset_train.txt', required=True)
+    parser.add_argument('--batch_size', help='batch size (default: 20)', type=int, default=20)
+    parser.add_argument('--batches', help='number of batches (default: 10)', type=int, default=10)
+    parser.add_argument('--workers', help='comma separated numbers of prefetching threads (default: 1,2,4)', default='1,2,4')
+    parser.add_argument('--processes', help='processes building the cache (default: number of cpus)', type=int, default=None)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    cache = PoseNetCache(processes=args.processes)
+    input_provider = PoseNetInputProvider(args.base_dir, cache)
+    print 'cache of {} images of shape {}: {:.2f}sec'.format(len(input_provider.images), input_provider.images.shape[1:],
+                                                            time.time() - start_time)
+    batches = min(args.batches, (len(input_provider.filenames) - 1) // args.batch_size)
+
+    decode_ms = time_batches(decode_batches, input_provider, args.batch_size, batches)
+    print '{:>20}: {:9.2f}ms/batch'.format('decode and rescale', decode_ms)
+    for workers in [int(workers) for workers in args.workers.split(',')]:
+        input_provider.prefetch_workers = workers
+        cached_ms = time_batches(cached_batches, input_provider, args.batch_size, batches)
+        print '{:>20}: {:9.2f}ms/batch, speedup: {:.2f}x'.format('cache, {} threads'.format(workers), cached_ms, decode_ms / cached_ms)
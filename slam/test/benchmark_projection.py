@@ -0,0 +1,80 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from scipy import ndimage
+from slam.preprocess.frame_index import load_frame_table
+from slam.utils import se3
+from slam.utils.projection import get_camera, get_sequence_camera, DEPTH_FACTOR
+
+"""
+ Measures the time of the overlap of two frames for dynamic frame dropping: back-projecting the depth
+ image of one frame and scoring the overlap of its points with the other frame. Compares the per-pixel
+ loops used before (with the pixel index fixed) with the vectorized camera for a few pixel steps, which
+ trade accuracy for speed, and voxel sizes, which even out the density of the points at an extra cost.
+ Uses consecutive frames of a sequence if --seq_dir is given, a synthetic scene otherwise.
+"""
+
+def point_cloud_loop(depth_image, camera):
+    pointcloud = np.zeros((depth_image.shape[0] * depth_image.shape[1], 3))
+    for v in range(depth_image.shape[0]):
+        for u in range(depth_image.shape[1]):
+            index = u + v * depth_image.shape[1]
+            pointcloud[index, 2] = depth_image[v, u] / camera.depth_factor
+            pointcloud[index, 0] = (u - camera.cx) * pointcloud[index, 2] / camera.fx
+            pointcloud[index, 1] = (v - camera.cy) * pointcloud[index, 2] / camera.fy
+    return pointcloud[pointcloud[:, 2] != 0.0]
+
+def overlap_loop(pointcloud, trans, camera):
+    pointcloud = np.dot(pointcloud, trans[0:3, 0:3].T) + trans[0:3, 3]
+    c = 0.0
+    for i in range(pointcloud.shape[0]):
+        u = pointcloud[i, 0] * camera.fx / pointcloud[i, 2] + camera.cx
+        v = pointcloud[i, 1] * camera.fy / pointcloud[i, 2] + camera.cy
+        if pointcloud[i, 2] > 0 and 0 <= u <= camera.width and 0 <= v <= camera.height:
+            c += 1
+    return c / pointcloud.shape[0]
+
+def _synthetic_pair():
+    # a slanted wall with some noise, the second camera is moved by 10cm and rotated by 3 degrees
+    rows, columns = np.mgrid[0:480, 0:640]
+    depth = (1.5 + columns / 640.0 + 0.01 * np.random.rand(480, 640)) * DEPTH_FACTOR
+    depth[np.random.rand(480, 640) < 0.1] = 0
+    trans = se3.exp([0.1, 0.0, 0.02, 0.0, np.radians(3), 0.0])
+    return depth.astype(np.uint16), trans
+
+def _sequence_pair(seq_dir, offset):
+    frame_table = load_frame_table(seq_dir)
+    depth = ndimage.imread(os.path.join(seq_dir, frame_table.depth_filename(offset)))
+    poses = se3.quaternion_to_transformation(frame_table.groundtruth_poses()[offset:offset + 2])
+    # transforms points of the first frame into the second one
+    return depth, se3.relative(poses[1], poses[0])
+
+def _time(function, repeat):
+    start_time = time.time()
+    for _ in xrange(repeat):
+        result = function()
+    return (time.time() - start_time) * 1000.0 / repeat, result
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the overlap of two frames')
+    parser.add_argument('--seq_dir', help='directory of a TUM sequence (default: synthetic scene)', default=None)
+    parser.add_argument('--offset', help='first frame of the pair in the sequence (default: 0)', type=int, default=0)
+    parser.add_argument('--repeat', help='number of repetitions (default: 20)', type=int, default=20)
+    parser.add_argument('--skip_loops', help='do not time the per-pixel loops', action='store_true')
+    args = parser.parse_args()
+
+    if args.seq_dir:
+        camera = get_sequence_camera(args.seq_dir)
+        depth, trans = _sequence_pair(args.seq_dir, args.offset)
+    else:
+        camera = get_camera(1)
+        depth, trans = _synthetic_pair()
+
+    if not args.skip_loops:
+        ms, overlap = _time(lambda: overlap_loop(point_cloud_loop(depth, camera), trans, camera), 1)
+        print '{:>24}: {:9.2f}ms/pair, overlap {:.4f}'.format('loops', ms, overlap)
+    for step, voxel_size in [(1, None), (2, None), (4, None), (1, 0.02), (1, 0.05)]:
+        ms, overlap = _time(lambda: camera.overlap(camera.back_project(depth, step, voxel_size), trans), args.repeat)
+        print '{:>24}: {:9.2f}ms/pair, overlap {:.4f}'.format('step {}, voxel {}'.format(step, voxel_size), ms, overlap)
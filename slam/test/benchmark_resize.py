@@ -0,0 +1,55 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from scipy import ndimage
+from slam.network.image_resize import METHODS, resize
+from slam.preprocess.frame_index import load_frame_table
+
+"""
+ Compares the resize backends on rgb (uint8) and depth (uint16) images. Reports the time per frame and
+ the mean and maximal absolute pixel error against the skimage resize used so far. Real frames of a
+ sequence are used if --seq_dir is given, random images of 640x480 otherwise.
+"""
+
+def _load_frames(seq_dir, frames):
+    frame_table = load_frame_table(seq_dir)
+    frames = min(frames, len(frame_table))
+    rgb_filenames = frame_table.rgb_filenames()
+    depth_filenames = frame_table.depth_filenames()
+    return [(ndimage.imread(os.path.join(seq_dir, rgb_filenames[i])), ndimage.imread(os.path.join(seq_dir, depth_filenames[i])))
+            for i in xrange(frames)]
+
+def _synthetic_frames(frames):
+    # smooth images, white noise would overstate the error of every backend
+    rgb = ndimage.gaussian_filter(np.random.rand(frames, 480, 640, 3), (0, 8, 8, 0))
+    depth = ndimage.gaussian_filter(np.random.rand(frames, 480, 640), (0, 8, 8))
+    rgb = (255 * (rgb - rgb.min()) / (rgb.max() - rgb.min())).astype(np.uint8)
+    depth = (40000 * (depth - depth.min()) / (depth.max() - depth.min())).astype(np.uint16)
+    return zip(rgb, depth)
+
+def _benchmark(images, size, method):
+    start_time = time.time()
+    resized = [resize(image, size, size, method) for image in images]
+    return (time.time() - start_time) * 1000.0 / len(images), resized
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the image resize backends')
+    parser.add_argument('--seq_dir', help='directory of a TUM sequence (default: synthetic images)', default=None)
+    parser.add_argument('--frames', help='number of frames resized (default: 50)', type=int, default=50)
+    parser.add_argument('--size', help='width and height of the resized images (default: 224)', type=int, default=224)
+    args = parser.parse_args()
+
+    if args.seq_dir:
+        frames = _load_frames(args.seq_dir, args.frames)
+    else:
+        frames = _synthetic_frames(args.frames)
+
+    for channel, images in [('rgb', [rgb for rgb, _ in frames]), ('depth', [depth for _, depth in frames])]:
+        _, reference = _benchmark(images, args.size, 'skimage')
+        for method in METHODS:
+            ms_per_frame, resized = _benchmark(images, args.size, method)
+            errors = np.abs(np.array(resized, dtype=np.float64) - np.array(reference, dtype=np.float64))
+            print '{:>5} {:>8}: {:7.2f}ms/frame, error mean {:7.3f} max {:9.3f}'.format(
+                channel, method, ms_per_frame, errors.mean(), errors.max())
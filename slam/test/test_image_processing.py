@@ -0,0 +1,35 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+from slam.network.image_processing import read_rgbd_image
+
+"""
+ Checks that the skimage and the image_resize paths of read_rgbd_image scale the depth alike, on a 16-bit
+ depth image read at its own size, so that the resize does not change the values.
+"""
+
+class TestReadRgbdImage(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rgb_filename = os.path.join(self.directory, 'rgb.png')
+        self.depth_filename = os.path.join(self.directory, 'depth.png')
+        Image.fromarray(np.random.randint(0, 256, (48, 64, 3)).astype(np.uint8)).save(self.rgb_filename)
+        depth = np.random.randint(0, 60000, (48, 64)).astype(np.uint16)
+        depth[0, 0] = 60000
+        Image.fromarray(depth).save(self.depth_filename)
+        self.depth = depth
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_depth_scaling_of_resize_paths(self):
+        skimage_img = read_rgbd_image(self.rgb_filename, self.depth_filename, 64, 48, 'skimage')
+        bilinear_img = read_rgbd_image(self.rgb_filename, self.depth_filename, 64, 48, 'bilinear')
+        self.assertEqual(skimage_img.shape, (48, 64, 4))
+        np.testing.assert_allclose(skimage_img, bilinear_img, atol=1e-3)
+        np.testing.assert_allclose(skimage_img[:, :, 3], self.depth * (255.0 / 60000), atol=1e-3)
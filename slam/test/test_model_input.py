@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+from slam.network.model_input import SimpleInputProvider
+
+"""
+ Checks the windows of SimpleInputProvider.sequence_batch_itr on small synthetic sequences which are
+ shorter than the windows, in frames or in keyframes.
+"""
+
+CHANNEL_STATS = {'mean': [0.0] * 4, 'std': [1.0] * 4}
+
+def write_sequence(seq_dir, frames):
+    # frames of the size of the TUM cameras, which the keyframe selection projects into
+    os.makedirs(os.path.join(seq_dir, 'rgb'))
+    os.makedirs(os.path.join(seq_dir, 'depth'))
+    with open(os.path.join(seq_dir, 'rgb.txt'), 'w') as rgb_file, open(os.path.join(seq_dir, 'depth.txt'), 'w') as depth_file:
+        for i in xrange(frames):
+            stamp = 100 + i * 0.033
+            Image.fromarray(np.random.randint(0, 255, (480, 640, 3)).astype(np.uint8)).save(os.path.join(seq_dir, 'rgb', '{}.png'.format(i)))
+            Image.fromarray(np.random.randint(1, 30000, (480, 640)).astype(np.int32)).save(os.path.join(seq_dir, 'depth', '{}.png'.format(i)))
+            rgb_file.write('{:.6f} rgb/{}.png\n'.format(stamp, i))
+            depth_file.write('{:.6f} depth/{}.png\n'.format(stamp + 0.001, i))
+    with open(os.path.join(seq_dir, 'groundtruth.txt'), 'w') as groundtruth_file:
+        for i in xrange(frames * 4):
+            groundtruth_file.write('{:.4f} {:f} 0 0 0 0 0 1\n'.format(100 + i * 0.01, i * 0.01))
+
+
+class TestSequenceBatchItr(unittest.TestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.short_dir = os.path.join(self.base_dir, 'rgbd_dataset_freiburg1_short')
+        self.long_dir = os.path.join(self.base_dir, 'rgbd_dataset_freiburg1_long')
+        write_sequence(self.short_dir, 3)
+        write_sequence(self.long_dir, 8)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def provider(self, seq_dirs, **kwargs):
+        return SimpleInputProvider(lambda: seq_dirs, CHANNEL_STATS, resize_method='bilinear', depth_resize_method='bilinear', **kwargs)
+
+    def test_short_sequence_is_skipped(self):
+        input_provider = self.provider([self.short_dir, self.long_dir], strides=[1, 4])
+        for _ in xrange(5):
+            batches = list(input_provider.sequence_batch_itr(6, 2))
+            self.assertEqual(len(batches), 6)
+            self.assertEqual(set(sum(input_provider.batch_iterator.seq_dirs, [])), set([self.long_dir]))
+
+    def test_only_short_sequences(self):
+        input_provider = self.provider([self.short_dir])
+        with self.assertRaisesRegexp(ValueError, self.short_dir):
+            input_provider.sequence_batch_itr(6, 2)
+        # the windows of the short sequence are packed into the lanes instead
+        batches = list(input_provider.sequence_batch_itr(6, 2, packed=True))
+        self.assertEqual(len(batches), 6)
+        self.assertEqual(np.count_nonzero(input_provider.batch_iterator.valid), 12)
+
+    def test_fewer_keyframes_than_window(self):
+        # the camera moves by a few centimeters, so that only the first frame is a keyframe
+        input_provider = self.provider([self.long_dir], keyframe_overlap=0.9)
+        with self.assertRaisesRegexp(ValueError, self.long_dir):
+            input_provider.sequence_batch_itr(6, 2)
+        self.assertLess(len(input_provider._sequence(self.long_dir)['frame_indices']), 6)
+        batches = list(input_provider.sequence_batch_itr(6, 2, packed=True))
+        self.assertEqual(len(batches), 6)
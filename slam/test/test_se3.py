@@ -0,0 +1,167 @@
+import unittest
+
+import numpy as np
+from slam.utils import se3
+
+"""
+ Compares the batched transformations of slam.utils.se3 with the scalar helpers they replaced, which are
+ kept here as reference. The helpers are unchanged apart from the fix in _trans_to_twist.
+"""
+
+def _quat_to_transformation(groundtruth):
+    t = groundtruth[0:3]
+    q = groundtruth[3:7]
+    q_x = q[0]
+    q_y = q[1]
+    q_z = q[2]
+    q_w = q[3]
+
+    trans = np.zeros((4, 4))
+    trans[0, 0] = q_w * q_w + q_x * q_x - q_y * q_y - q_z * q_z
+    trans[1, 0] = 2 * (q_x * q_y + q_w * q_z)
+    trans[2, 0] = 2 * (q_z * q_x - q_w * q_y)
+    trans[3, 0] = 0
+
+    trans[0, 1] = 2 * (q_x * q_y - q_w * q_z)
+    trans[1, 1] = q_w * q_w - q_x * q_x + q_y * q_y - q_z * q_z
+    trans[2, 1] = 2 * (q_y * q_z + q_w * q_x)
+    trans[3, 1] = 0
+
+    trans[0, 2] = 2 * (q_z * q_x + q_w * q_y)
+    trans[1, 2] = 2 * (q_y * q_z - q_w * q_x)
+    trans[2, 2] = q_w * q_w - q_x * q_x - q_y * q_y + q_z * q_z
+    trans[3, 2] = 0
+
+    trans[0, 3] = t[0]
+    trans[1, 3] = t[1]
+    trans[2, 3] = t[2]
+    trans[3, 3] = 1
+
+    return trans
+
+def _trans_to_twist(trans):
+    # compute angular velocities
+    if (np.trace(trans[0:3, 0:3]) - 1) / 2 > 1:
+        return np.zeros(6)
+
+    argument = (np.trace(trans[0:3, 0:3]) - 1) / 2
+    if np.abs(argument) > 1:
+        argument = 1 * argument / np.abs(argument)
+    w_abs = np.arccos(argument)
+    w = np.zeros(3)
+    w[0] = 1 / (2 * np.sin(w_abs)) * (trans[2, 1] - trans[1, 2]) * w_abs
+    w[1] = 1 / (2 * np.sin(w_abs)) * (trans[0, 2] - trans[2, 0]) * w_abs
+    w[2] = 1 / (2 * np.sin(w_abs)) * (trans[1, 0] - trans[0, 1]) * w_abs
+
+    w_hat = np.zeros((3, 3))
+    w_hat[0] = [0, -w[2], w[1]]
+    w_hat[1] = [w[2], 0, -w[0]]
+    w_hat[2] = [-w[1], w[0], 0]
+
+    w_abs = np.linalg.norm(w)
+
+    if w_abs == 0:
+        return np.zeros(6)
+
+    w = np.matrix(w)
+    w_hat = np.matrix(w_hat)
+    # the outer product w^T w, the helper used the inner product w w^T, a 1x1 matrix which was added to all
+    # entries and made the translational part inconsistent with _twist_to_trans
+    omega = (np.matrix((np.eye(3) - trans[0:3, 0:3])) * w_hat + np.transpose(w) * w) / (w_abs * w_abs)
+    v = np.transpose(np.linalg.inv(omega) * np.transpose(np.matrix(trans[0:3, 3])))
+
+    return np.concatenate((v, w), 1)
+
+def _inverse_trans(trans):
+    inv_trans = np.zeros((4, 4))
+    inv_trans[0:3, 0:3] = np.transpose(trans[0:3, 0:3])
+    inv_trans[0:3, 3] = np.squeeze(-np.matrix(inv_trans[0:3, 0:3]) * np.transpose(np.matrix(trans[0:3, 3])))
+    inv_trans[3, 3] = 1
+
+    return inv_trans
+
+def _twist_to_trans(twist):
+    v = np.matrix(twist[0:3])
+    w = np.matrix(twist[3:6])
+    w_abs = np.linalg.norm(w)
+    w_hat = np.zeros((3, 3))
+    w_hat[0] = [0, -w[0, 2], w[0, 1]]
+    w_hat[1] = [w[0, 2], 0, -w[0, 0]]
+    w_hat[2] = [-w[0, 1], w[0, 0], 0]
+    w_hat = np.matrix(w_hat)
+
+    rot = np.eye(3) + w_hat / w_abs * np.sin(w_abs) + w_hat * w_hat / (w_abs * w_abs) * (1 - np.cos(w_abs))
+
+    trans = (np.matrix((np.eye(3) - rot)) * w_hat * np.transpose(v) + np.transpose(w) * w * np.transpose(v)) / (w_abs * w_abs)
+
+    tr = np.zeros((4, 4))
+    tr[0:3, 0:4] = np.concatenate((rot, trans), 1)
+    tr[3, 3] = 1
+
+    return tr
+
+
+def _random_poses(n, max_angle=np.pi * 0.95, min_angle=0.01):
+    axes = np.random.randn(n, 3)
+    axes /= np.linalg.norm(axes, axis=1)[:, None]
+    angles = np.random.uniform(min_angle, max_angle, n)
+    quaternions = np.concatenate((axes * np.sin(angles / 2)[:, None], np.cos(angles / 2)[:, None]), 1)
+    return np.concatenate((np.random.randn(n, 3), quaternions), 1)
+
+
+class Se3Test(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.poses = _random_poses(200)
+        self.trans = np.array([_quat_to_transformation(pose) for pose in self.poses])
+
+    def test_quaternion_to_transformation(self):
+        np.testing.assert_allclose(se3.quaternion_to_transformation(self.poses), self.trans, atol=1e-12)
+        np.testing.assert_allclose(se3.quaternion_to_transformation(self.poses[0]), self.trans[0], atol=1e-12)
+
+    def test_inverse(self):
+        expected = np.array([_inverse_trans(trans) for trans in self.trans])
+        np.testing.assert_allclose(se3.inverse(self.trans), expected, atol=1e-12)
+        np.testing.assert_allclose(se3.compose(se3.inverse(self.trans), self.trans), np.tile(np.eye(4), (200, 1, 1)), atol=1e-12)
+
+    def test_compose(self):
+        expected = np.array([np.dot(first, second) for first, second in zip(self.trans, self.trans[::-1])])
+        np.testing.assert_allclose(se3.compose(self.trans, self.trans[::-1]), expected, atol=1e-12)
+        np.testing.assert_allclose(se3.relative(self.trans[0], self.trans),
+                                   [np.dot(_inverse_trans(self.trans[0]), trans) for trans in self.trans], atol=1e-12)
+
+    def test_log(self):
+        expected = np.array([np.asarray(_trans_to_twist(trans)).ravel() for trans in self.trans])
+        np.testing.assert_allclose(se3.log(self.trans), expected, atol=1e-8)
+        np.testing.assert_allclose(se3.log(self.trans[0]), expected[0], atol=1e-8)
+
+    def test_exp(self):
+        twists = se3.log(self.trans)
+        expected = np.array([_twist_to_trans(twist) for twist in twists])
+        np.testing.assert_allclose(se3.exp(twists), expected, atol=1e-8)
+        np.testing.assert_allclose(se3.exp(twists), self.trans, atol=1e-8)
+
+    def test_small_angles(self):
+        for angle in [0.0, 1e-12, 1e-8, 1e-5, 1e-3]:
+            poses = _random_poses(50, angle, angle)
+            trans = se3.quaternion_to_transformation(poses)
+            twists = se3.log(trans)
+            self.assertTrue(np.all(np.isfinite(twists)))
+            np.testing.assert_allclose(np.linalg.norm(twists[:, 3:6], axis=1), angle, atol=1e-10)
+            np.testing.assert_allclose(se3.exp(twists), trans, atol=1e-10)
+        # the twist of a pure translation is the translation
+        trans = se3.quaternion_to_transformation(_random_poses(50, 0.0, 0.0))
+        np.testing.assert_allclose(se3.log(trans), np.concatenate((trans[:, 0:3, 3], np.zeros((50, 3))), 1), atol=1e-15)
+
+    def test_near_pi(self):
+        for angle in [np.pi - 1e-2, np.pi - 1e-4, np.pi - 1e-7, np.pi]:
+            poses = _random_poses(50, angle, angle)
+            trans = se3.quaternion_to_transformation(poses)
+            twists = se3.log(trans)
+            self.assertTrue(np.all(np.isfinite(twists)))
+            np.testing.assert_allclose(se3.exp(twists), trans, atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
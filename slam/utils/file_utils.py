@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+
+
+def is_up_to_date(target_file, source_files):
+    """
+    Returns True if target_file exists and is newer than all existing source_files.
+    """
+    if not os.path.exists(target_file):
+        return False
+    target_mtime = os.path.getmtime(target_file)
+    return all(os.path.getmtime(source_file) < target_mtime for source_file in source_files if os.path.exists(source_file))
+
+@contextmanager
+def atomic_save(filename):
+    """
+    Yields the name of a temporary file next to filename, with the same extension, and renames it to
+    filename when the block completes, so that readers never load or map a partially written file. The
+    temporary file is removed if the block fails.
+    """
+    root, extension = os.path.splitext(filename)
+    tmp_file = root + '.tmp' + extension
+    try:
+        yield tmp_file
+    except:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    os.rename(tmp_file, filename)
+
+def parameter_key(parameters):
+    """
+    Returns a short key of a json-serializable dict of parameters, e.g. to name cache files after the
+    preprocessing parameters they were built with.
+    """
+    return hashlib.md5(json.dumps(parameters, sort_keys=True)).hexdigest()[:12]
@@ -0,0 +1,156 @@
+"""
+Vectorized back-projection of depth images and projection of point clouds for the cameras of the TUM
+RGB-D benchmark. A Camera precomputes the viewing ray of every pixel once, so that back-projecting a depth
+image is a product with the depth instead of a loop over the pixels, and scores the overlap of a point
+cloud with its image in one reduction.
+"""
+
+import os
+import re
+
+import numpy as np
+
+
+# focal length x, focal length y, optical center x and optical center y of fr1/fr2/fr3
+FX = [517.3, 520.9, 535.4]
+FY = [516.5, 521.0, 539.2]
+CX = [318.6, 325.1, 320.1]
+CY = [255.3, 249.7, 247.6]
+
+# the 16-bit depth PNG files are scaled by 5000, i.e. a value of 5000 is 1m
+DEPTH_FACTOR = 5000.0
+
+
+class Camera:
+
+    def __init__(self, fx, fy, cx, cy, width=640, height=480, depth_factor=DEPTH_FACTOR):
+        self.fx = fx
+        self.fy = fy
+        self.cx = cx
+        self.cy = cy
+        self.width = width
+        self.height = height
+        self.depth_factor = depth_factor
+        # x / z and y / z of the points seen by every pixel
+        self.ray_x = np.tile((np.arange(width, dtype=np.float32) - cx) / fx, (height, 1))
+        self.ray_y = np.tile(((np.arange(height, dtype=np.float32) - cy) / fy)[:, None], (1, width))
+
+    def back_project(self, depth_image, step=1, voxel_size=None):
+        """
+        Returns the points of shape [n, 3] seen by the pixels of a depth image with a valid depth, in meters
+        in the camera frame. Only every step-th pixel in both directions is used, which is the way to make
+        the overlap cheaper. The points are optionally subsampled to one point per voxel of voxel_size
+        meters, which evens out their density between near and far surfaces but costs a pass over all
+        points, more than the overlap of the points itself.
+        """
+        depth = depth_image[::step, ::step]
+        valid = depth > 0
+        z = depth[valid].astype(np.float32) / self.depth_factor
+        x = self.ray_x[::step, ::step][valid] * z
+        y = self.ray_y[::step, ::step][valid] * z
+        if voxel_size:
+            first = _first_of_voxels((x, y, z), voxel_size)
+            x, y, z = x[first], y[first], z[first]
+        points = np.empty((len(z), 3), dtype=np.float32)
+        points[:, 0] = x
+        points[:, 1] = y
+        points[:, 2] = z
+        return points
+
+    def project(self, points, trans=None):
+        """
+        Returns the pixel coordinates and depths [u, v, d] of shape [n, 3] of points of shape [n, 3],
+        which are transformed by the 4x4 transformation trans first if it is given.
+        """
+        if trans is not None:
+            points = transform_points(points, trans)
+        uvd = np.empty(points.shape, dtype=np.float32)
+        uvd[:, 2] = points[:, 2]
+        uvd[:, 0] = points[:, 0] * self.fx / points[:, 2] + self.cx
+        uvd[:, 1] = points[:, 1] * self.fy / points[:, 2] + self.cy
+        return uvd
+
+    def overlap(self, points, trans=None):
+        """
+        Returns the fraction of the points, transformed by trans into the frame of this camera, which
+        are in front of the camera and project into its image.
+        """
+        if len(points) == 0:
+            return 0.0
+        # the homogeneous pixel coordinates q = K (R p + t) of shape [3, n] are compared with the image
+        # bounds scaled by the depth, which avoids the divisions for u and v
+        projection = np.array([[self.fx, 0, self.cx], [0, self.fy, self.cy], [0, 0, 1]])
+        offset = np.zeros(3)
+        if trans is not None:
+            offset = np.dot(projection, trans[0:3, 3])
+            projection = np.dot(projection, trans[0:3, 0:3])
+        q = np.dot(projection.astype(points.dtype), points.T)
+        q += offset.astype(points.dtype)[:, None]
+        q_x, q_y, z = q
+        inside = z > 0
+        inside &= q_x >= 0
+        inside &= q_y >= 0
+        bound = self.width * z
+        inside &= q_x <= bound
+        np.multiply(self.height, z, out=bound)
+        inside &= q_y <= bound
+        return np.count_nonzero(inside) / float(len(points))
+
+
+def transform_points(points, trans):
+    """
+    Applies the 4x4 transformation trans to points of shape [n, 3].
+    """
+    trans = np.asarray(trans, dtype=points.dtype)
+    return np.dot(points, trans[0:3, 0:3].T) + trans[0:3, 3]
+
+def voxel_subsample(points, voxel_size):
+    """
+    Keeps the first point of every voxel of voxel_size meters, the voxel grid starts at the lowest
+    coordinates of the points.
+    """
+    return points[_first_of_voxels(points.T, voxel_size)]
+
+def _first_of_voxels(coordinates, voxel_size, max_cells_per_point=8):
+    # the voxels of the points hashed into one int64 key, computed on the coordinate arrays which are
+    # contiguous in back_project
+    keys = np.zeros(len(coordinates[0]), dtype=np.int64)
+    cells = 1
+    for values in coordinates:
+        voxels = ((values - values.min()) * np.float32(1.0 / voxel_size)).astype(np.int64)
+        extent = int(voxels.max()) + 1
+        keys *= extent
+        keys += voxels
+        cells *= extent
+    index = np.arange(len(keys))
+    if cells > max_cells_per_point * len(keys):
+        # sparse grids of small voxels
+        first = np.zeros(len(keys), dtype=bool)
+        first[np.unique(keys, return_index=True)[1]] = True
+        return first
+    # the first point of a voxel is the last one written into its cell in reverse order, a scatter into a
+    # dense grid instead of sorting the keys
+    owner = np.empty(cells, dtype=np.int64)
+    owner[keys[::-1]] = index[::-1]
+    return owner[keys] == index
+
+
+_cameras = {}
+
+def get_camera(dataset_int):
+    """
+    Returns the camera of the freiburg dataset number dataset_int (1, 2 or 3).
+    """
+    if dataset_int not in _cameras:
+        _cameras[dataset_int] = Camera(FX[dataset_int - 1], FY[dataset_int - 1], CX[dataset_int - 1], CY[dataset_int - 1])
+    return _cameras[dataset_int]
+
+def get_sequence_camera(seq_dir):
+    """
+    Returns the camera of a sequence by the freiburg number in its directory name, e.g.
+    rgbd_dataset_freiburg2_xyz or freiburg3_teddy.
+    """
+    match = re.search(r'freiburg([123])', os.path.basename(os.path.normpath(seq_dir)))
+    if match is None:
+        raise ValueError('No freiburg camera in the name of the sequence:{}'.format(seq_dir))
+    return get_camera(int(match.group(1)))
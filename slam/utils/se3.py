@@ -0,0 +1,155 @@
+"""
+Batched rigid body transformations. All functions work on arrays with arbitrary leading dimensions, e.g.
+poses of shape [n, 7], transformations of shape [n, 4, 4] and twists of shape [n, 6], as well as on
+single ones.
+
+poses    -- [tx ty tz qx qy qz qw] like in the TUM groundtruth files, the quaternions are expected to be
+            normalized
+twists   -- [vx vy vz wx wy wz], the exponential coordinates of a transformation, i.e. w is the rotation
+            axis scaled by the rotation angle
+"""
+
+import numpy as np
+
+
+# below this angle the coefficients of exp and log are evaluated by their Taylor series
+SMALL_ANGLE = 1e-4
+
+# above pi - this angle the rotation axis of log is taken from the symmetric part of the rotation
+NEAR_PI_ANGLE = 1e-3
+
+
+def hat(w):
+    """
+    Returns the skew-symmetric matrices of shape [..., 3, 3] of vectors of shape [..., 3].
+    """
+    w = np.asarray(w, dtype=np.float64)
+    w_hat = np.zeros(w.shape + (3,))
+    w_hat[..., 0, 1] = -w[..., 2]
+    w_hat[..., 0, 2] = w[..., 1]
+    w_hat[..., 1, 0] = w[..., 2]
+    w_hat[..., 1, 2] = -w[..., 0]
+    w_hat[..., 2, 0] = -w[..., 1]
+    w_hat[..., 2, 1] = w[..., 0]
+    return w_hat
+
+def quaternion_to_transformation(poses):
+    """
+    Converts poses of shape [..., 7] into transformations of shape [..., 4, 4].
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    q_x, q_y, q_z, q_w = poses[..., 3], poses[..., 4], poses[..., 5], poses[..., 6]
+
+    trans = np.zeros(poses.shape[:-1] + (4, 4))
+    trans[..., 0, 0] = q_w * q_w + q_x * q_x - q_y * q_y - q_z * q_z
+    trans[..., 1, 0] = 2 * (q_x * q_y + q_w * q_z)
+    trans[..., 2, 0] = 2 * (q_z * q_x - q_w * q_y)
+
+    trans[..., 0, 1] = 2 * (q_x * q_y - q_w * q_z)
+    trans[..., 1, 1] = q_w * q_w - q_x * q_x + q_y * q_y - q_z * q_z
+    trans[..., 2, 1] = 2 * (q_y * q_z + q_w * q_x)
+
+    trans[..., 0, 2] = 2 * (q_z * q_x + q_w * q_y)
+    trans[..., 1, 2] = 2 * (q_y * q_z - q_w * q_x)
+    trans[..., 2, 2] = q_w * q_w - q_x * q_x - q_y * q_y + q_z * q_z
+
+    trans[..., 0:3, 3] = poses[..., 0:3]
+    trans[..., 3, 3] = 1
+    return trans
+
+def inverse(trans):
+    """
+    Inverts transformations of shape [..., 4, 4].
+    """
+    trans = np.asarray(trans, dtype=np.float64)
+    inv_trans = np.zeros(trans.shape)
+    inv_trans[..., 0:3, 0:3] = np.swapaxes(trans[..., 0:3, 0:3], -1, -2)
+    inv_trans[..., 0:3, 3] = -np.einsum('...ji,...j->...i', trans[..., 0:3, 0:3], trans[..., 0:3, 3])
+    inv_trans[..., 3, 3] = 1
+    return inv_trans
+
+def compose(first, second):
+    """
+    Returns the products first * second of transformations of shape [..., 4, 4], broadcasting over the
+    leading dimensions.
+    """
+    return np.einsum('...ij,...jk->...ik', first, second)
+
+def relative(first, second):
+    """
+    Returns the transformations inverse(first) * second.
+    """
+    return compose(inverse(first), second)
+
+def _rotation_log(rot):
+    """
+    Returns the rotation vectors of shape [..., 3] of rotation matrices of shape [..., 3, 3].
+    """
+    skew = np.stack([rot[..., 2, 1] - rot[..., 1, 2],
+                     rot[..., 0, 2] - rot[..., 2, 0],
+                     rot[..., 1, 0] - rot[..., 0, 1]], -1)
+    # the skew-symmetric part is 2 sin(angle) axis, atan2 is accurate for all angles unlike arccos
+    cos_angle = (np.trace(rot, axis1=-2, axis2=-1) - 1) / 2
+    angle = np.arctan2(np.linalg.norm(skew, axis=-1) / 2, cos_angle)
+
+    # angle / (2 sin(angle)), which tends to 1/2 + angle^2 / 12 for small angles
+    small = angle < SMALL_ANGLE
+    sin_angle = np.sin(np.where(small, 1.0, angle))
+    factor = np.where(small, 0.5 + angle ** 2 / 12, angle / (2 * sin_angle))
+    w = factor[..., None] * skew
+
+    # close to pi the skew-symmetric part vanishes, the axis is taken from the symmetric part
+    # (rot + rot^T) / 2 = cos(angle) I + (1 - cos(angle)) axis axis^T
+    near_pi = angle > np.pi - NEAR_PI_ANGLE
+    if np.any(near_pi):
+        cos_near_pi = cos_angle[near_pi][:, None, None]
+        outer = ((rot[near_pi] + np.swapaxes(rot[near_pi], -1, -2)) / 2 - cos_near_pi * np.eye(3)) / (1 - cos_near_pi)
+        diagonal = np.diagonal(outer, axis1=-2, axis2=-1)
+        rows = np.arange(len(outer))
+        column = np.argmax(diagonal, -1)
+        axis = outer[rows, :, column] / np.sqrt(diagonal[rows, column])[:, None]
+        sign = np.where(np.einsum('ij,ij->i', axis, skew[near_pi]) < 0, -1.0, 1.0)
+        w[near_pi] = axis * (sign * angle[near_pi])[:, None]
+    return w, angle
+
+def log(trans):
+    """
+    Returns the twists of shape [..., 6] of transformations of shape [..., 4, 4].
+    """
+    trans = np.asarray(trans, dtype=np.float64)
+    w, angle = _rotation_log(trans[..., 0:3, 0:3])
+    w_hat = hat(w)
+
+    # v = V^-1 t with V^-1 = I - w_hat / 2 + c * w_hat^2 and c = (1 - angle sin(angle) / (2 (1 - cos(angle)))) / angle^2
+    small = angle < SMALL_ANGLE
+    safe_angle = np.where(small, 1.0, angle)
+    c = np.where(small, 1.0 / 12 + angle ** 2 / 720,
+                 (1 - safe_angle * np.sin(safe_angle) / (2 * (1 - np.cos(safe_angle)))) / safe_angle ** 2)
+    t = trans[..., 0:3, 3]
+    w_hat_t = np.einsum('...ij,...j->...i', w_hat, t)
+    v = t - w_hat_t / 2 + c[..., None] * np.einsum('...ij,...j->...i', w_hat, w_hat_t)
+    return np.concatenate((v, w), -1)
+
+def exp(twist):
+    """
+    Returns the transformations of shape [..., 4, 4] of twists of shape [..., 6].
+    """
+    twist = np.asarray(twist, dtype=np.float64)
+    v = twist[..., 0:3]
+    w_hat = hat(twist[..., 3:6])
+    w_hat_squared = np.einsum('...ij,...jk->...ik', w_hat, w_hat)
+    angle = np.linalg.norm(twist[..., 3:6], axis=-1)
+
+    # sin(angle) / angle, (1 - cos(angle)) / angle^2 and (angle - sin(angle)) / angle^3
+    small = angle < SMALL_ANGLE
+    safe_angle = np.where(small, 1.0, angle)
+    a = np.where(small, 1 - angle ** 2 / 6, np.sin(safe_angle) / safe_angle)
+    b = np.where(small, 0.5 - angle ** 2 / 24, (1 - np.cos(safe_angle)) / safe_angle ** 2)
+    c = np.where(small, 1.0 / 6 - angle ** 2 / 120, (safe_angle - np.sin(safe_angle)) / safe_angle ** 3)
+
+    trans = np.zeros(twist.shape[:-1] + (4, 4))
+    trans[..., 0:3, 0:3] = np.eye(3) + a[..., None, None] * w_hat + b[..., None, None] * w_hat_squared
+    translation = np.eye(3) + b[..., None, None] * w_hat + c[..., None, None] * w_hat_squared
+    trans[..., 0:3, 3] = np.einsum('...ij,...j->...i', translation, v)
+    trans[..., 3, 3] = 1
+    return trans